@@ -1,46 +1,18 @@
-MARKET_CONFIG = {
-    'US': {
-        'timezone': 'US/Eastern',
-        'currency_symbol': '$',
-        'market_open_time': (9, 30),
-        'market_close_time': (16, 0),
-        'weekends': [5, 6],
-        'suffix_patterns': ['', '.US'],
-        'name': 'US Market'
-    },
-    'IN': {
-        'timezone': 'Asia/Kolkata',
-        'currency_symbol': '₹',
-        'market_open_time': (9, 15),
-        'market_close_time': (15, 30),
-        'weekends': [5, 6],
-        'suffix_patterns': ['.NS', '.BO'],
-        'name': 'Indian Market'
-    }
-}
-
-
-def detect_market(symbol: str) -> str:
-    """Detect market type based on symbol suffix"""
-    symbol = symbol.upper()
-    if any(symbol.endswith(suffix) for suffix in MARKET_CONFIG['IN']['suffix_patterns']):
-        return 'IN'
-    return 'US'
-
-
 from langchain_core.messages import HumanMessage, ToolMessage, AIMessage
 from langgraph.graph.message import add_messages 
 from typing import Dict, List, Annotated, TypedDict, Optional, Any
 import json
-import yfinance as yf
 
 from langgraph.graph import StateGraph, END, START
 from langchain_core.messages.base import BaseMessage
+from langchain_core.runnables import RunnableLambda
 
 from ..tools .news import News
-from .trendingsearch import extract_tickers
+from ..tools .batch import price_changes
+from .trendingsearch import get_trending_tickers
 from .subgraph import stock_analysis_graph, SubState
-from .structuringnode import structuring_chain
+from .structuringnode import structuring_chain, astructuring_chain
+from .metrics_callback import metrics_callback
 
 
 
@@ -82,6 +54,7 @@ class TopState(TypedDict):
     stock: str
     news_sentiment: News
     analyst_output: str 
+    structured_output: Optional[Dict]
     trending_stocks: Dict[str,Any]
 
 
@@ -96,19 +69,12 @@ def router_node(state : TopState):
 
 
 def get_trending_stocks(limit: int = 5):
-    return extract_tickers()
+    return get_trending_tickers()[:limit]
 
 def recommend_trending_stocks_node(state : TopState):
-    tickers = get_trending_stocks()[:5]
-    data = {}
-    for stock in tickers:
-      dat = yf.Ticker(stock)
-      opening_price = dat.history().iloc[-1]['Open']
-      closing_price = dat.analyst_price_targets['current']
-      points_change = closing_price - opening_price
-      percentage_change = (points_change / opening_price) * 100
-
-      data[stock] = {"points_change": round(points_change, 2), "percentage_change" : round(percentage_change, 2)}
+    tickers = get_trending_stocks()
+    # One batched download of the last few daily bars for every ticker, cached for a short TTL
+    data = price_changes(tickers)
 
     return {
         "messages": state["messages"] + [AIMessage(content=f"The trending stocks are \n\n{json.dumps(data, indent=2)}")],
@@ -116,12 +82,42 @@ def recommend_trending_stocks_node(state : TopState):
     }
 
 def structure_analyst_output(state: TopState):
+    # The analyst already produced StockAnalysisOutput in a single pass
+    if state.get('structured_output'):
+        return {
+            "messages": [AIMessage(content=str(state['structured_output']))],
+            "structured_output": state['structured_output']
+        }
+
     analyst_output = state['analyst_output']
     for i in range(3):
         try:
             result = structuring_chain(analyst_output)  
             return {
-                "messages": [AIMessage(content=str(result))]
+                "messages": [AIMessage(content=str(result))],
+                "structured_output": result
+            }
+        except Exception as e:
+            print(f"Attempt {i+1} failed: {e}")  
+            continue
+    
+    raise Exception("Could not structure the analyst output")
+
+async def astructure_analyst_output(state: TopState):
+    # The analyst already produced StockAnalysisOutput in a single pass
+    if state.get('structured_output'):
+        return {
+            "messages": [AIMessage(content=str(state['structured_output']))],
+            "structured_output": state['structured_output']
+        }
+
+    analyst_output = state['analyst_output']
+    for i in range(3):
+        try:
+            result = await astructuring_chain(analyst_output)  
+            return {
+                "messages": [AIMessage(content=str(result))],
+                "structured_output": result
             }
         except Exception as e:
             print(f"Attempt {i+1} failed: {e}")  
@@ -137,20 +133,29 @@ graph_builder = StateGraph(TopState)
 
 
 def finance_analyst(state : TopState):
-  state = stock_analysis_graph.invoke({"messages" : [HumanMessage(content = "Should I buy this stock?")], "stock": "AAPL"})
+  state = stock_analysis_graph.invoke({"messages" : [HumanMessage(content = "Should I buy this stock?")], "stock": state['stock']})
+  return {
+        'analyst_output': state['messages'][-1].content,
+        'structured_output': state.get('structured_output'),
+        'news_sentiment': get_latest_news_sentiment_tool_message(state)
+    }
+
+async def afinance_analyst(state : TopState):
+  state = await stock_analysis_graph.ainvoke({"messages" : [HumanMessage(content = "Should I buy this stock?")], "stock": state['stock']})
   return {
         'analyst_output': state['messages'][-1].content,
+        'structured_output': state.get('structured_output'),
         'news_sentiment': get_latest_news_sentiment_tool_message(state)
     }
 
 
 
-graph_builder.add_node(finance_analyst, 'finance_analyst')
+graph_builder.add_node('finance_analyst', RunnableLambda(finance_analyst, afinance_analyst))
 
 
 graph_builder.add_node("recommend_trending", recommend_trending_stocks_node)
 
-graph_builder.add_node("structure_analyst_output", structure_analyst_output)
+graph_builder.add_node("structure_analyst_output", RunnableLambda(structure_analyst_output, astructure_analyst_output))
 
 
 graph_builder.add_conditional_edges(START,
@@ -163,5 +168,6 @@ graph_builder.add_edge('finance_analyst', 'structure_analyst_output')
 graph_builder.add_edge('structure_analyst_output', END)
 graph_builder.add_edge("recommend_trending", END)
 
-TopGraph = graph_builder.compile()
+# Times every node, subgraph node, tool and LLM call run under the graph (see /metrics)
+TopGraph = graph_builder.compile().with_config(callbacks=[metrics_callback])
 
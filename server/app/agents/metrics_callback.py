@@ -0,0 +1,99 @@
+"""
+LangChain callback that records graph node, tool and LLM timings in app.metrics.
+
+Attached to the compiled TopGraph, so every node, subgraph node and tool run
+under it is timed, and to the LLM clients themselves, so model calls made
+outside a graph (e.g. by the prewarm scheduler) are timed too. LangChain
+skips a handler it already has, so a call is never recorded twice.
+"""
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from ..metrics import LLM_SECONDS, LLM_TOKENS, NODE_SECONDS, TOOL_SECONDS
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    # Only updates in-memory metrics; never worth a thread hop under async runs
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}  # run_id -> (histogram child, start time, model name for LLM runs)
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, histogram, model=None):
+        with self._lock:
+            self._started[run_id] = (histogram, time.perf_counter(), model)
+
+    def _end(self, run_id):
+        """Observe the run's duration; returns its model name for LLM runs"""
+        with self._lock:
+            entry = self._started.pop(run_id, None)
+        if entry is None:
+            return None
+        histogram, start, model = entry
+        histogram.observe(time.perf_counter() - start)
+        return model
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        node = (metadata or {}).get('langgraph_node')
+        # Each node also wraps an inner runnable of the same name; only time the node-level run.
+        # LangGraph's own __start__ node only writes the input into the state
+        if node and not node.startswith('__') and kwargs.get('name') == node and any(tag.startswith('graph:step:') for tag in tags or []):
+            self._start(run_id, NODE_SECONDS.labels(node=node))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get('name') or (serialized or {}).get('name', 'unknown')
+        self._start(run_id, TOOL_SECONDS.labels(tool=name))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        model = _model_name(serialized, metadata)
+        self._start(run_id, LLM_SECONDS.labels(model=model), model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model = self._end(run_id) or 'unknown'
+        prompt_tokens, completion_tokens = _token_usage(response)
+        LLM_TOKENS.labels(model=model, kind='prompt').inc(prompt_tokens)
+        LLM_TOKENS.labels(model=model, kind='completion').inc(completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+def _model_name(serialized, metadata):
+    return (metadata or {}).get('ls_model_name') or (serialized or {}).get('name') or 'unknown'
+
+
+def _token_usage(response):
+    """(prompt, completion) tokens of an LLMResult, from the messages' usage metadata or the provider's llm_output"""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if usage:
+                prompt_tokens += usage.get('input_tokens', 0)
+                completion_tokens += usage.get('output_tokens', 0)
+    if not (prompt_tokens or completion_tokens):
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+    return prompt_tokens, completion_tokens
+
+
+metrics_callback = MetricsCallbackHandler()
@@ -69,19 +69,29 @@ structure_prompt = """
 
 
 
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
+from functools import lru_cache
 import os 
 from dotenv import load_dotenv
 
+from ..llms import get_llm
+
 load_dotenv()
-os.environ['groq_api_key_dev'] = os.getenv("groq_api_key_dev")
 
 
-def structuring_chain(analysis: str):
-  llm = ChatGroq(model = 'deepseek-r1-distill-llama-70b', groq_api_key = os.getenv("groq_api_key_dev"))
-  structuring_llm = llm.with_structured_output(StockAnalysisOutput)
+@lru_cache(maxsize=None)
+def get_structuring_chain():
+  """Prompt and structured-output model, compiled once and reused by every call"""
+  structuring_llm = get_llm('reasoning').with_structured_output(StockAnalysisOutput)
   prompt = PromptTemplate.from_template(structure_prompt)
-  chain = prompt | structuring_llm 
-  result = chain.invoke({"unstructured_analysis": analysis}) 
-  return result.dict()
\ No newline at end of file
+  return prompt | structuring_llm 
+
+
+def structuring_chain(analysis: str):
+  result = get_structuring_chain().invoke({"unstructured_analysis": analysis}) 
+  return result.dict()
+
+
+async def astructuring_chain(analysis: str):
+  result = await get_structuring_chain().ainvoke({"unstructured_analysis": analysis}) 
+  return result.dict()
@@ -1,10 +1,11 @@
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.graph import StateGraph, START, END
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
+from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage
 from langgraph.graph.message import add_messages 
 from typing import Dict, List, Annotated, TypedDict, Optional
 from pydantic import Field, BaseModel
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+from langchain_core.runnables import RunnableLambda, RunnableParallel
 
 FUNDAMENTAL_ANALYST_PROMPT = """
 You are a senior fundamental analyst with expertise in equity research and quantitative analysis. You specialize in evaluating company performance for {company} using comprehensive data analysis including stock prices, technical indicators, financial metrics, and market sentiment.
@@ -80,70 +81,129 @@ Based on the quantitative analysis above, provide a definitive recommendation: *
 **REMEMBER**: Every statement must be supported by specific numerical data from the provided inputs. Explain not just what the numbers are, but what they mean for investors and why they matter in the current market context.
 """
 
-MARKET_CONFIG = {
-    'US': {
-        'timezone': 'US/Eastern',
-        'currency_symbol': '$',
-        'market_open_time': (9, 30),  # 9:30 AM
-        'market_close_time': (16, 0),  # 4:00 PM
-        'weekends': [5, 6],  # Saturday, Sunday
-        'suffix_patterns': ['', '.US'],  # No suffix or .US
-        'name': 'US Market'
-    },
-    'IN': {
-        'timezone': 'Asia/Kolkata',
-        'currency_symbol': '₹',
-        'market_open_time': (9, 15),  # 9:15 AM
-        'market_close_time': (15, 30),  # 3:30 PM
-        'weekends': [5, 6],  # Saturday, Sunday
-        'suffix_patterns': ['.NS', '.BO'],  # NSE (.NS) and BSE (.BO)
-        'name': 'Indian Market'
-    }
-}
-
-def detect_market(symbol):
-    """Detect market type based on symbol suffix"""
-    symbol = symbol.upper()
-    
-    if any(symbol.endswith(suffix) for suffix in MARKET_CONFIG['IN']['suffix_patterns']):
-        return 'IN'
-    
-    return 'US'
-
-
 class SubState(TypedDict):
   messages: Annotated[List, add_messages]
   stock: str
+  structured_output: Optional[Dict]
 
 
 subgraph_builder = StateGraph(SubState)
 
 
 from ..tools .news import News, get_news_sentiment
+from ..tools .markets import MARKET_CONFIG, detect_market
 from ..tools .stocksummary import get_stock_summary
+from .structuringnode import StockAnalysisOutput
+from ..llms import get_llm
 
 tools = [get_news_sentiment, get_stock_summary]
 
 import os 
+import json
 from dotenv import load_dotenv
 load_dotenv()
 
-os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
-llm = ChatOpenAI(model = 'gpt-4o-mini', temperature = 0.1)
-llm_with_tool = llm.bind_tools(tools)
-
-
-def fundamental_analyst(state: SubState):
-    currency_symbol = MARKET_CONFIG[detect_market(state['stock'])]
-    messages = [
+# Both tools are always needed, so by default run them up front instead of
+# waiting for the LLM to ask for them (saves a full LLM round trip)
+PREFETCH_TOOLS = os.getenv("ANALYST_PREFETCH_TOOLS", "true").lower() == "true"
+# Have the analyst write StockAnalysisOutput directly, skipping the separate structuring
+# LLM pass. Needs prefetched tool data since a structured-output call cannot call tools.
+STRUCTURED_OUTPUT = PREFETCH_TOOLS and os.getenv("ANALYST_STRUCTURED_OUTPUT", "false").lower() == "true"
+
+@lru_cache(maxsize=None)
+def get_analyst_llm():
+    """The analyst model, configured for the active mode and built once"""
+    llm = get_llm('analyst')
+    if STRUCTURED_OUTPUT:
+        return llm.with_structured_output(StockAnalysisOutput)
+    if PREFETCH_TOOLS:
+        # With prefetched data the analyst answers directly and never needs to call tools
+        return llm
+    return llm.bind_tools(tools)
+
+
+def _tool_message_content(output):
+    """Stringify a tool result the same way ToolNode does"""
+    if isinstance(output, str):
+        return output
+    try:
+        return json.dumps(output, ensure_ascii=False)
+    except Exception:
+        return str(output)
+
+
+def _safe_tool(tool):
+    """Run a tool on a ticker, returning errors as content like ToolNode does"""
+    def run(ticker: str):
+        try:
+            return tool.invoke(ticker)
+        except Exception as e:
+            return f"Error: {repr(e)}"
+
+    async def arun(ticker: str):
+        try:
+            return await tool.ainvoke(ticker)
+        except Exception as e:
+            return f"Error: {repr(e)}"
+
+    return RunnableLambda(run, arun, name=tool.name)
+
+
+# Runs every tool concurrently on the same ticker
+prefetch_runnable = RunnableParallel({tool.name: _safe_tool(tool) for tool in tools})
+
+
+def _prefetch_messages(stock: str, outputs: Dict):
+    """Record prefetched results as a tool-call exchange so downstream readers see the usual messages"""
+    tool_calls = [
+        {'name': name, 'args': {'ticker': stock}, 'id': f'prefetch_{name}'}
+        for name in outputs
+    ]
+    return [AIMessage(content='', tool_calls=tool_calls)] + [
+        ToolMessage(content=_tool_message_content(output), name=name, tool_call_id=f'prefetch_{name}')
+        for name, output in outputs.items()
+    ]
+
+
+def prefetch_tools(state: SubState):
+    outputs = prefetch_runnable.invoke(state['stock'])
+    return {'messages': _prefetch_messages(state['stock'], outputs)}
+
+async def aprefetch_tools(state: SubState):
+    outputs = await prefetch_runnable.ainvoke(state['stock'])
+    return {'messages': _prefetch_messages(state['stock'], outputs)}
+
+
+def _analyst_messages(state: SubState):
+    currency_symbol = MARKET_CONFIG[detect_market(state['stock'])]['currency_symbol']
+    return [
         SystemMessage(content=FUNDAMENTAL_ANALYST_PROMPT.format(company=state['stock'], currency_symbol = currency_symbol)),
     ]  + state['messages']
+
+def _analyst_update(result):
+    if isinstance(result, StockAnalysisOutput):
+        structured = result.dict()
+        return {
+            'messages': AIMessage(content=str(structured)),
+            'structured_output': structured
+        }
     return {
-        'messages': llm_with_tool.invoke(messages)
+        'messages': result
     }
 
-subgraph_builder.add_node('fundamental_analyst', fundamental_analyst)
-subgraph_builder.add_edge(START, 'fundamental_analyst')
+def fundamental_analyst(state: SubState):
+    return _analyst_update(get_analyst_llm().invoke(_analyst_messages(state)))
+
+async def afundamental_analyst(state: SubState):
+    return _analyst_update(await get_analyst_llm().ainvoke(_analyst_messages(state)))
+
+subgraph_builder.add_node('fundamental_analyst', RunnableLambda(fundamental_analyst, afundamental_analyst))
+if PREFETCH_TOOLS:
+    subgraph_builder.add_node('prefetch_tools', RunnableLambda(prefetch_tools, aprefetch_tools))
+    subgraph_builder.add_edge(START, 'prefetch_tools')
+    subgraph_builder.add_edge('prefetch_tools', 'fundamental_analyst')
+else:
+    subgraph_builder.add_edge(START, 'fundamental_analyst')
 subgraph_builder.add_node(ToolNode(tools))
 subgraph_builder.add_conditional_edges('fundamental_analyst', tools_condition)
 subgraph_builder.add_edge('tools', 'fundamental_analyst')
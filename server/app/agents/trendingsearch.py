@@ -1,56 +1,85 @@
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from langchain_openai import OpenAI
-from langchain.agents import initialize_agent, Tool
-from langchain.agents import AgentType
 import os
 import re
+import time
+from collections import Counter
+from functools import lru_cache
 from dotenv import load_dotenv
 load_dotenv()
 
-llm_search = OpenAI(temperature=0)
-search = GoogleSerperAPIWrapper()
-os.environ["SERPER_API_KEY"] = os.getenv("SERPER_API_KEY")
-
-tools = [
-    Tool(
-        name="Search",
-        func=search.run,
-        description="Search for current market information, trending stocks, and stock tickers"
-    )
-]
-
-agent = initialize_agent(
-    tools, 
-    llm_search, 
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION, 
-    verbose=True, 
-    max_iterations=5,
-    handle_parsing_errors=True
-)
-
-enforced_prompt = """
-Search for the most trending and actively traded stocks today. Look for:
-1. Most active stocks by volume
-2. Top gainers and losers
-3. Trending stocks on social media
-4. Stocks with high analyst interest
-
-Find 10-15 stock ticker symbols (like AAPL, GOOGL, MSFT, TSLA, etc.) that are currently trending.
-Return ONLY the ticker symbols in a comma-separated format: AAPL, GOOGL, MSFT, TSLA, NVDA, etc.
-
-Do not include any explanations, just the ticker symbols.
-"""
-
-
-def extract_tickers(text):
-    """Extract tickers from google search results"""
-    ticker_pattern = r'\b[A-Z]{2,5}\b'
-    tickers = re.findall(ticker_pattern, text)
-    
-    exclude_words = {'THE', 'AND', 'FOR', 'ARE', 'BUT', 'NOT', 'YOU', 'ALL', 'CAN', 'HER', 'WAS', 'ONE', 'OUR', 'HAD', 'BUT', 'WHAT', 'YOUR', 'WHEN', 'HIM', 'MY', 'HAS', 'BEEN', 'MORE', 'WHO', 'OIL', 'GAS', 'NEW', 'NOW', 'OLD', 'SEE', 'TWO', 'WAY', 'ITS', 'DID', 'GET', 'MAY', 'SAY', 'SHE', 'USE', 'HOW', 'TOP', 'DAY', 'OUT', 'OFF', 'GET', 'END', 'WHY', 'LET', 'PUT', 'TOO', 'RUN', 'GOT', 'TRY', 'WIN', 'YES', 'BUY', 'SELL', 'HOLD', 'STOCK', 'STOCKS', 'MARKET', 'TRADING', 'PRICE', 'VOLUME', 'TODAY', 'WEEK', 'MONTH', 'YEAR', 'HIGH', 'LOW', 'CHANGE', 'PERCENT', 'GAIN', 'LOSS', 'SHARES', 'COMPANY', 'TECH', 'SECTOR', 'INDEX', 'FUND', 'TRADE', 'INVEST', 'MONEY', 'CASH', 'BANK', 'FINANCIAL', 'BUSINESS', 'NEWS', 'REPORT', 'EARNINGS', 'REVENUE', 'PROFIT', 'GROWTH', 'RATE', 'ANALYSIS', 'RECOMMENDATION', 'ANALYST', 'RESEARCH', 'UPGRADE', 'DOWNGRADE', 'TARGET', 'ESTIMATE', 'FORECAST', 'OUTLOOK', 'PERFORMANCE', 'RESULT', 'QUARTER', 'ANNUAL', 'MONTHLY', 'WEEKLY', 'DAILY', 'CURRENT', 'LATEST', 'RECENT', 'ACTIVE', 'POPULAR', 'TRENDING', 'VOLATILE', 'STABLE', 'RISING', 'FALLING', 'BULLISH', 'BEARISH', 'NEUTRAL', 'POSITIVE', 'NEGATIVE', 'STRONG', 'WEAK', 'BEST', 'WORST', 'MOST', 'LEAST', 'FIRST', 'LAST', 'NEXT', 'PREVIOUS', 'ABOVE', 'BELOW', 'BETWEEN', 'WITHIN', 'AROUND', 'OVER', 'UNDER', 'NEAR', 'FAR', 'CLOSE', 'OPEN', 'AFTER', 'BEFORE', 'DURING', 'WHILE', 'SINCE', 'UNTIL', 'FROM', 'WITH', 'WITHOUT', 'THROUGH', 'ACROSS', 'ALONG', 'AROUND', 'BEHIND', 'BEYOND', 'DURING', 'EXCEPT', 'INSIDE', 'OUTSIDE', 'TOWARD', 'WITHIN', 'AGAINST', 'BETWEEN', 'THROUGH', 'ACROSS', 'ALONG', 'AROUND', 'BEHIND', 'BEYOND', 'DURING', 'EXCEPT', 'INSIDE', 'OUTSIDE', 'TOWARD', 'WITHIN', 'AGAINST', 'BETWEEN'}
-    
-    
-    filtered_tickers = [ticker for ticker in tickers if ticker not in exclude_words]
-    unique_tickers = list(dict.fromkeys(filtered_tickers))  
-    
-    return unique_tickers[:15]
+from ..tools.chart_cache import LRUCache
+from ..tools.markets import session_cache_expiry
+from ..tools.symbols import symbol_index
+
+TRENDING_QUERY = "most active trending stocks today top gainers losers ticker symbols"
+TRENDING_LIMIT = 15
+# Seconds to keep tickers that could not be checked against the symbol index, so a later request can validate them
+UNVALIDATED_TTL = int(os.getenv("TRENDING_UNVALIDATED_TTL", 300))
+
+# NSE/BSE symbols with their exchange suffix, or uppercase words of 2-5 letters
+TICKER_PATTERN = re.compile(r'\b(?:[A-Z0-9&]{2,10}\.(?:NS|BO)|[A-Z]{2,5})\b')
+
+# Uppercase words common in market headlines that are not tickers; only needed while a market is not in the symbol index
+STOP_WORDS = {
+    'THE', 'AND', 'FOR', 'TOP', 'NEW', 'ALL', 'ARE', 'NOT', 'BUT', 'WITH', 'FROM', 'THIS', 'THAT', 'TODAY', 'MOST',
+    'CEO', 'CFO', 'IPO', 'ETF', 'EPS', 'GDP', 'CPI', 'FED', 'SEC', 'USA', 'USD', 'INR', 'AI', 'US', 'UK', 'EU',
+    'NYSE', 'AMEX', 'NSE', 'BSE', 'OTC', 'DOW', 'SP', 'INC', 'LTD', 'CORP', 'CO', 'PLC', 'LLC',
+    'BUY', 'SELL', 'HOLD', 'UP', 'DOWN', 'HIGH', 'LOW', 'STOCK', 'STOCKS', 'SHARE', 'PRICE', 'NEWS',
+}
+
+# One ticker list per market session
+trending_cache = LRUCache(max_entries=8, name='trending')
+
+
+@lru_cache(maxsize=None)
+def _serper():
+    from langchain_community.utilities import GoogleSerperAPIWrapper
+    return GoogleSerperAPIWrapper()
+
+
+def serper_search(query: str) -> str:
+    """Google results (answer box and snippets) for `query`, as one block of text"""
+    return _serper().run(query)
+
+
+_search_provider = serper_search
+
+
+def set_search_provider(provider):
+    """Replace the search call, e.g. with a local stub in tests; `provider(query) -> str`"""
+    global _search_provider
+    _search_provider = provider
+    trending_cache.clear()
+
+
+def extract_tickers(text: str, limit: int = TRENDING_LIMIT):
+    """
+    (tickers, validated): ticker symbols mentioned in `text`, most mentioned first.
+    `validated` is False when some candidate's market is not in the symbol index yet; those candidates
+    only have common words filtered out.
+    """
+    counts = Counter(TICKER_PATTERN.findall(text))
+    # Counter keeps first-seen order among equal counts
+    candidates = [ticker for ticker, _ in counts.most_common()]
+
+    validated = all(symbol_index.covers(ticker) for ticker in candidates)
+    if not validated:
+        print("Symbol index not built for every market; returning unvalidated ticker candidates")
+    candidates = [
+        ticker for ticker in candidates
+        if (symbol_index.is_listed(ticker) if symbol_index.covers(ticker) else ticker not in STOP_WORDS)
+    ]
+    return candidates[:limit], validated
+
+
+def get_trending_tickers(market_type: str = 'US'):
+    """
+    Trending tickers from a single search call, cached until the current market session changes.
+    Unvalidated tickers are only cached for UNVALIDATED_TTL seconds.
+    """
+    tickers = trending_cache.get(market_type)
+    if tickers is None:
+        tickers, validated = extract_tickers(_search_provider(TRENDING_QUERY))
+        if tickers:
+            expires_at = session_cache_expiry(market_type) if validated else time.time() + UNVALIDATED_TTL
+            trending_cache.set(market_type, tickers, expires_at)
+    return list(tickers)
@@ -47,7 +47,7 @@ def verify_access_token(token: str, credentials_exception):
     return token_data 
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credential_exception = HTTPException(status_code = status.HTTP_401_UNAUTHORIZED, detail = "Could not validate credentials")
 
     token_data = verify_access_token(token, credential_exception)
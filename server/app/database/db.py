@@ -1,34 +1,122 @@
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from datetime import datetime, timedelta  
 from . import models 
-from ..utils import hash_password, verify
+from ..utils import hash_password_async
 
-def create_user(db: Session, email_id: str, name: str, password: str):
-    email = db.query(models.UserData).filter(models.UserData.email == email_id).first()
-    if email:
+async def create_user(db: AsyncSession, email_id: str, name: str, password: str):
+    if await get_user_by_email(db, email_id):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    user = models.UserData(name = name, email = email_id, password = hash_password(password))
+    user = models.UserData(name = name, email = email_id, password = await hash_password_async(password))
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
-def get_user_by_email(db: Session, email_id: str):
-    user = db.query(models.UserData).filter(models.UserData.email == email_id).first()
-    return user 
+async def get_user_by_email(db: AsyncSession, email_id: str):
+    result = await db.execute(select(models.UserData).filter(models.UserData.email == email_id))
+    return result.scalars().first()
 
-def delete_user_by_email(db: Session, email_id: str):
-    user = db.query(models.UserData).filter(models.UserData.email == email_id).first()
+async def delete_user_by_email(db: AsyncSession, email_id: str):
+    user = await get_user_by_email(db, email_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    db.delete(user)
-    db.commit()
+    # SQLite does not enforce the ON DELETE CASCADE unless foreign keys are switched on per connection
+    await db.execute(delete(models.Watchlist).where(models.Watchlist.user_id == user.id))
+    await db.delete(user)
+    await db.commit()
     
     return {"message": f"User with email {email_id} has been deleted successfully"}
 
 
+def get_article_sentiments(db: Session, ticker: str, article_keys: list):
+    rows = db.query(models.ArticleSentiment).filter(
+        models.ArticleSentiment.ticker == ticker,
+        models.ArticleSentiment.article_key.in_(article_keys)
+    ).all()
+    return {row.article_key: row for row in rows}
+
+def save_article_sentiments(db: Session, rows: list):
+    for row in rows:
+        db.merge(row)
+    db.commit()
+
+def get_news_digest(db: Session, ticker: str):
+    return db.query(models.NewsDigest).filter(models.NewsDigest.ticker == ticker).first()
+
+def save_news_digest(db: Session, ticker: str, summary: str):
+    db.merge(models.NewsDigest(ticker = ticker, summary = summary, updated_at = datetime.now()))
+    db.commit()
+
+def get_listed_symbols(db: Session):
+    return db.query(models.ListedSymbol).all()
+
+def get_symbol_index_builds(db: Session):
+    return db.query(models.SymbolIndexBuild).all()
+
+def replace_listed_symbols(db: Session, market: str, rows: list, built_at: datetime):
+    db.query(models.ListedSymbol).filter(models.ListedSymbol.market == market).delete()
+    db.bulk_save_objects(rows)
+    db.merge(models.SymbolIndexBuild(market = market, built_at = built_at))
+    db.commit()
+
+def update_listed_symbol(db: Session, symbol: str, **fields):
+    row = db.query(models.ListedSymbol).filter(models.ListedSymbol.symbol == symbol).first()
+    if row is None:
+        row = models.ListedSymbol(symbol = symbol, updated_at = datetime.now())
+        db.add(row)
+    for key, value in fields.items():
+        setattr(row, key, value)
+    db.commit()
+
+def get_fundamentals(db: Session, ticker: str):
+    return db.query(models.Fundamentals).filter(models.Fundamentals.ticker == ticker).first()
+
+def save_fundamentals(db: Session, ticker: str, info: str, trading_day: str):
+    db.merge(models.Fundamentals(ticker = ticker, info = info, trading_day = trading_day, updated_at = datetime.now()))
+    db.commit()
+
+def get_analysis_result(db: Session, ticker: str, route: str, session: str):
+    return db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.ticker == ticker,
+        models.AnalysisResult.route == route,
+        models.AnalysisResult.session == session,
+        models.AnalysisResult.expires_at > datetime.now()
+    ).first()
+
+def save_analysis_result(db: Session, ticker: str, route: str, session: str, payload: str, expires_at: datetime):
+    db.merge(models.AnalysisResult(
+        ticker = ticker, route = route, session = session, payload = payload,
+        created_at = datetime.now(), expires_at = expires_at
+    ))
+    db.query(models.AnalysisResult).filter(models.AnalysisResult.expires_at <= datetime.now()).delete()
+    db.commit()
+
+def get_watchlist(db: Session, user_id: int):
+    return db.query(models.Watchlist).filter(models.Watchlist.user_id == user_id).order_by(models.Watchlist.created_at).all()
+
+def add_to_watchlist(db: Session, user_id: int, ticker: str):
+    entry = db.query(models.Watchlist).filter(models.Watchlist.user_id == user_id, models.Watchlist.ticker == ticker).first()
+    if entry:
+        return entry
+    entry = models.Watchlist(user_id = user_id, ticker = ticker)
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+def remove_from_watchlist(db: Session, user_id: int, ticker: str):
+    entry = db.query(models.Watchlist).filter(models.Watchlist.user_id == user_id, models.Watchlist.ticker == ticker).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Ticker not in watchlist")
+    db.delete(entry)
+    db.commit()
+    return {"message": f"{ticker} removed from watchlist"}
 
+def get_watched_tickers(db: Session):
+    return [ticker for (ticker,) in db.query(models.Watchlist.ticker).distinct().all()]
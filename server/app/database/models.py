@@ -1,6 +1,7 @@
 from sqlalchemy.ext.declarative import declarative_base 
-from sqlalchemy import Column, Integer, String, Float, DateTime, create_engine
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, UniqueConstraint, create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime
 
 import os 
@@ -9,8 +10,29 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./financial_agent.db")
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds before a connection is replaced
 
-engine = create_engine(DATABASE_URL, echo = True) 
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a sync DATABASE_URL, e.g. sqlite:// -> sqlite+aiosqlite://"""
+    drivers = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg'}
+    scheme, _, rest = url.partition('://')
+    driver = drivers.get(scheme.split('+')[0])
+    return f"{driver}://{rest}" if driver else url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+
+pool_options = dict(pool_size = DB_POOL_SIZE, max_overflow = DB_MAX_OVERFLOW, pool_timeout = DB_POOL_TIMEOUT, pool_recycle = DB_POOL_RECYCLE, pool_pre_ping = True)
+
+# Sync engine for the query pipeline, caches and background jobs (run on worker threads)
+engine = create_engine(DATABASE_URL, echo = SQL_ECHO, **pool_options)
+# Async engine for request handlers that only touch the database, e.g. login and register
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo = SQL_ECHO, **pool_options)
 Base = declarative_base()
 
 class UserData(Base):
@@ -23,7 +45,71 @@ class UserData(Base):
     created_at = Column(DateTime, default = datetime.now)
 
 
-Base.metadata.create_all(bind = engine)
+class Watchlist(Base):
+    __tablename__ = 'watchlist'
+    __table_args__ = (UniqueConstraint('user_id', 'ticker'),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('user_data.id', ondelete='CASCADE'), index=True)
+    ticker = Column(String, index=True)
+    created_at = Column(DateTime, default = datetime.now)
+
+
+class ArticleSentiment(Base):
+    __tablename__ = 'article_sentiment'
+    ticker = Column(String, primary_key=True)
+    article_key = Column(String, primary_key=True)  # sha1 of canonical url, or of the title
+    title = Column(String)
+    url = Column(String)
+    sentiment = Column(String)
+    score = Column(Integer)
+    created_at = Column(DateTime, default = datetime.now)
+
+
+class NewsDigest(Base):
+    __tablename__ = 'news_digest'
+    ticker = Column(String, primary_key=True)
+    summary = Column(Text)
+    updated_at = Column(DateTime, default = datetime.now, onupdate = datetime.now)
+
+
+class ListedSymbol(Base):
+    __tablename__ = 'symbol_index'
+    symbol = Column(String, primary_key=True)  # Yahoo Finance form, e.g. BRK-B or RELIANCE.NS
+    name = Column(String)
+    exchange = Column(String)
+    market = Column(String)  # key of MARKET_CONFIG
+    address = Column(String)  # filled from ticker.info the first time it is fetched
+    updated_at = Column(DateTime, default = datetime.now)
+
+
+class SymbolIndexBuild(Base):
+    __tablename__ = 'symbol_index_builds'
+    market = Column(String, primary_key=True)  # key of MARKET_CONFIG
+    built_at = Column(DateTime)  # last time the market's listings were downloaded and saved
+
+
+class Fundamentals(Base):
+    __tablename__ = 'fundamentals'
+    ticker = Column(String, primary_key=True)
+    info = Column(Text)  # ticker.info as JSON
+    trading_day = Column(String)  # session date (YYYY-MM-DD) the snapshot belongs to
+    updated_at = Column(DateTime, default = datetime.now, onupdate = datetime.now)
+
+
+class AnalysisResult(Base):
+    __tablename__ = 'analysis_result'
+    ticker = Column(String, primary_key=True)
+    route = Column(String, primary_key=True)  # graph route the query took, e.g. analyze_stock
+    session = Column(String, primary_key=True)  # market-session bucket, e.g. US:2026-10-16:open
+    payload = Column(Text)  # the /query response body
+    created_at = Column(DateTime, default = datetime.now)
+    expires_at = Column(DateTime, index=True)
+
+
+def init_db():
+    """Create missing tables; called from the app's startup hook instead of at import"""
+    Base.metadata.create_all(bind = engine)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -34,4 +120,11 @@ def get_db():
     finally:
         db.close()
 
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
     
\ No newline at end of file
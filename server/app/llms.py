@@ -0,0 +1,63 @@
+import os
+from functools import lru_cache
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# One pooled, keep-alive HTTP stack shared by every LLM client in the process
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 60))
+HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", 120))
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+@lru_cache(maxsize=None)
+def http_client() -> httpx.Client:
+    return httpx.Client(limits=_limits(), timeout=HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def http_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=_limits(), timeout=HTTP_TIMEOUT)
+
+
+def _analyst():
+    from langchain_openai import ChatOpenAI
+    from .agents .metrics_callback import metrics_callback
+    return ChatOpenAI(
+        model='gpt-4o-mini', temperature=0.1,
+        http_client=http_client(), http_async_client=http_async_client(),
+        callbacks=[metrics_callback],
+    )
+
+
+def _reasoning():
+    from langchain_groq import ChatGroq
+    from .agents .metrics_callback import metrics_callback
+    return ChatGroq(
+        model='deepseek-r1-distill-llama-70b', groq_api_key=os.getenv("groq_api_key_dev"),
+        http_client=http_client(), http_async_client=http_async_client(),
+        callbacks=[metrics_callback],
+    )
+
+
+LLM_REGISTRY = {
+    'analyst': _analyst,      # gpt-4o-mini, writes the fundamental analysis
+    'reasoning': _reasoning,  # deepseek-r1-distill-llama-70b, news sentiment and structuring
+}
+
+
+@lru_cache(maxsize=None)
+def get_llm(name: str):
+    """Return the shared client for a registered model, constructing it on first use"""
+    return LLM_REGISTRY[name]()
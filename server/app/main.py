@@ -1,10 +1,18 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Response, Request
+from fastapi.responses import StreamingResponse
+from typing import List
+import os
+import time
+import asyncio
+import importlib
 from sqlalchemy.orm import Session
-from .database .db import create_user, get_user_by_email, delete_user_by_email
-from .database .models import get_db
-from .utils import hash_password, verify
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database .db import create_user, get_user_by_email, delete_user_by_email, get_watchlist, add_to_watchlist, remove_from_watchlist
+from .database .models import get_db, get_async_db, init_db, async_engine
+from .utils import verify_async
 from .auth import create_access_token, get_current_user, verify_access_token
-from langchain_core.messages import HumanMessage
+from .metrics import HTTP_SECONDS, render as render_metrics
+from .profiling import profile_query, profiling_requested
 
 
 from pydantic import BaseModel, EmailStr
@@ -18,8 +26,25 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str 
 
+class WatchlistRequest(BaseModel):
+    ticker: str
+
+class QueryRequest(BaseModel):
+    query: str
+    ticker: str
+
+class BatchTicker(BaseModel):
+    ticker: str
+    analyze: bool = False  # also run the LLM analysis graph for this ticker
+
+class BatchQueryRequest(BaseModel):
+    query: str = ""
+    tickers: List[BatchTicker]
+
 
 from fastapi.middleware.cors import CORSMiddleware
+from .prewarm import start_scheduler
+from .tools .symbols import symbol_index
 
 
 app = FastAPI()
@@ -34,19 +59,36 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template so /watchlist/{ticker} is one series; streams are timed to their first byte
+    route = request.scope.get('route')
+    HTTP_SECONDS.labels(method=request.method, route=route.path if route else 'unmatched').observe(time.perf_counter() - start)
+    return response
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Hello, World!"}
 
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage latencies, LLM tokens and cache hit ratios"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.post('/login')
-def login(credentials: LoginRequest, response: Response, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, response: Response, db: AsyncSession = Depends(get_async_db)):
     try:
         email = credentials.email
         password = credentials.password
-        user = get_user_by_email(db, email)
+        user = await get_user_by_email(db, email)
         if user:
             response.status_code = status.HTTP_200_OK
-            if not verify(password, user.password):
+            if not await verify_async(password, user.password):
                 response.status_code = status.HTTP_401_UNAUTHORIZED
                 return {"detail": "Invalid Password"}
             
@@ -61,76 +103,117 @@ def login(credentials: LoginRequest, response: Response, db: Session = Depends(g
 
 
 @app.post('/register')
-def register(credentials: RegisterRequest, db: Session = Depends(get_db)):
+async def register(credentials: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         email = credentials.email 
         name = credentials.name  
         password = credentials.password 
-        user = get_user_by_email(db, email)
+        user = await get_user_by_email(db, email)
         if user:
             raise HTTPException(status_code=400, detail="Email already registered")
-        user = create_user(db, email, name, password)
+        user = await create_user(db, email, name, password)
         return {"message": "User created successfully", "user_id": user.id}
     except Exception as e:  
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete('/user')
-def delete_user(credentials: LoginRequest, response: Response, db: Session = Depends(get_db), user_id: str = Depends(get_current_user)):
-    user = get_user_by_email(db, credentials.email)
+async def delete_user(credentials: LoginRequest, response: Response, db: AsyncSession = Depends(get_async_db), user_id: str = Depends(get_current_user)):
+    user = await get_user_by_email(db, credentials.email)
     
     if not user or user.id != int(user_id.id):
         raise HTTPException(status_code=403, detail="Not authorized to delete this account")
 
-    if not verify(credentials.password, user.password):
+    if not await verify_async(credentials.password, user.password):
         raise HTTPException(status_code=401, detail="Incorrect password")
     
-    return delete_user_by_email(db, credentials.email)
-    
+    return await delete_user_by_email(db, credentials.email)
 
-import json
 
+@app.get('/watchlist')
+def read_watchlist(db: Session = Depends(get_db), user_id: str = Depends(get_current_user)):
+    return {"tickers": [entry.ticker for entry in get_watchlist(db, int(user_id.id))]}
 
-from .agents .maingraph import TopGraph
-from .tools .chart_cache import stock_analysis_charts
 
-class QueryRequest(BaseModel):
-    query: str
-    ticker: str
+@app.post('/watchlist')
+def add_watchlist_ticker(req: WatchlistRequest, db: Session = Depends(get_db), user_id: str = Depends(get_current_user)):
+    ticker = req.ticker.strip().upper()
+    if symbol_index.covers(ticker) and not symbol_index.is_listed(ticker):
+        raise HTTPException(status_code=400, detail=f"Unknown ticker {ticker}")
+    add_to_watchlist(db, int(user_id.id), ticker)
+    return {"message": f"{ticker} added to watchlist"}
 
 
-@app.post("/query")
-def query(req: QueryRequest, request: Request, response: Response, db: Session = Depends(get_db), user_id: str = Depends(get_current_user)):
-    state = TopGraph.invoke({
-        "messages": [HumanMessage(content=req.query)],
-        "stock": req.ticker
-    })
+@app.delete('/watchlist/{ticker}')
+def delete_watchlist_ticker(ticker: str, db: Session = Depends(get_db), user_id: str = Depends(get_current_user)):
+    return remove_from_watchlist(db, int(user_id.id), ticker.strip().upper())
+
+
+# Import the query pipeline (langgraph, plotly, yfinance, ...) after the app is already serving
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+
+
+def _warm_up():
+    from . import pipeline  # noqa: F401
 
-    charts_data = stock_analysis_charts(req.ticker)
-    
-    if charts_data is None:
-        return {"error": "Stock data not available for this ticker."}
-        
-    aiInsights = state['messages'][-1].content 
-    
-    # Combine all data into a single, cohesive JSON object
-
-    json_figures = {}
-    if 'figures' in charts_data and charts_data['figures']:
-        for name, fig_str in charts_data['figures'].items():
-            try:
-                # This is the key change! Parse the JSON string back into a dictionary.
-                json_figures[name] = json.loads(fig_str)
-            except json.JSONDecodeError:
-                # Handle cases where the string might not be valid JSON
-                print(f"Error decoding JSON for figure: {name}")
-                json_figures[name] = {} # Provide a fallback empty dictionary
-    return {
-        "figures": json_figures,  # Use the figures directly from the charts_data
-        "analysis_summary": charts_data['analysis_summary'],  # Use the summary directly
-        "trending_stocks": state.get('trending_stocks', {}),
-        "aiInsights": eval(aiInsights),
-        "sentiment": eval(state['news_sentiment'])
-    }
 
+@app.on_event("startup")
+async def startup():
+    init_db()
+    if WARM_UP_ON_STARTUP:
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(_warm_up))
+    # Watchlisted tickers are refreshed before each open and during the session
+    app.state.prewarm_tasks = start_scheduler()
 
+
+async def _load_pipeline():
+    """The query pipeline module, without ever importing it on the event loop"""
+    warm_up = getattr(app.state, 'warm_up', None)
+    if warm_up is not None:
+        # Shielded so a cancelled request doesn't cancel the import every other request waits on
+        await asyncio.shield(warm_up)
+        return importlib.import_module('.pipeline', __package__)
+    return await asyncio.to_thread(importlib.import_module, '.pipeline', __package__)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in getattr(app.state, 'prewarm_tasks', []):
+        task.cancel()
+    await async_engine.dispose()
+
+
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", 25))
+
+
+@app.post("/query")
+async def query(req: QueryRequest, request: Request, response: Response, user_id: str = Depends(get_current_user)):
+    # Admins can send X-Profile: <PROFILE_TOKEN> to get a sampled profile of this request
+    profile = profiling_requested(request.headers)
+    pipeline = await _load_pipeline()
+    if profile:
+        return await profile_query(pipeline.answer_query, req.query, req.ticker)
+    return await pipeline.answer_query(req.query, req.ticker)
+
+
+@app.post("/query/batch")
+async def query_batch(req: BatchQueryRequest, user_id: str = Depends(get_current_user)):
+    """Analysis summaries for several tickers from a single batched download; the LLM step is opt-in per ticker"""
+    tickers = list(dict.fromkeys(item.ticker for item in req.tickers))
+    if not tickers or len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {BATCH_MAX_TICKERS} tickers")
+    analyze = list(dict.fromkeys(item.ticker for item in req.tickers if item.analyze))
+
+    pipeline = await _load_pipeline()
+    return await pipeline.answer_batch(req.query, tickers, analyze)
+
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest, user_id: str = Depends(get_current_user)):
+    """Stream results as Server-Sent Events as soon as each part is ready"""
+    pipeline = await _load_pipeline()
+    return StreamingResponse(
+        pipeline.stream_query(req.query, req.ticker),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,54 @@
+"""
+Prometheus metrics for the query pipeline, served on /metrics.
+
+Latency histograms cover every stage a /query can spend time in: the
+LangGraph nodes, the tools, the yfinance requests, the LLM calls (with their
+token counts) and the chart builds. Cache lookups are counted per cache, with
+a hit-ratio gauge next to the counters.
+
+Only prometheus_client is imported here, so the app can serve /metrics
+without loading the query pipeline. With several worker processes, set
+PROMETHEUS_MULTIPROC_DIR to a shared, empty directory and every worker's
+samples are aggregated on scrape.
+"""
+import os
+import threading
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# LLM calls and full queries take tens of seconds; the default buckets stop at 10s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HTTP_SECONDS = Histogram('http_request_duration_seconds', 'Time to produce an HTTP response', ['method', 'route'], buckets=LATENCY_BUCKETS)
+NODE_SECONDS = Histogram('graph_node_duration_seconds', 'Time spent in one LangGraph node', ['node'], buckets=LATENCY_BUCKETS)
+TOOL_SECONDS = Histogram('tool_duration_seconds', 'Time spent in one tool call', ['tool'], buckets=LATENCY_BUCKETS)
+YFINANCE_SECONDS = Histogram('yfinance_call_duration_seconds', 'Time spent in one yfinance request', ['call'], buckets=LATENCY_BUCKETS)
+LLM_SECONDS = Histogram('llm_call_duration_seconds', 'Time spent in one LLM call', ['model'], buckets=LATENCY_BUCKETS)
+LLM_TOKENS = Counter('llm_tokens', 'Tokens used by LLM calls', ['model', 'kind'])  # kind: prompt or completion
+CHART_SECONDS = Histogram('chart_build_duration_seconds', 'Time to build and serialize one chart', ['chart'], buckets=LATENCY_BUCKETS)
+CACHE_LOOKUPS = Counter('cache_lookups', 'Cache lookups', ['cache', 'result'])  # result: hit or miss
+CACHE_HIT_RATIO = Gauge('cache_hit_ratio', 'Share of lookups served from the cache since the process started', ['cache'], multiprocess_mode='all')
+
+_cache_counts = {}  # cache -> [hits, lookups]
+_cache_counts_lock = threading.Lock()
+
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    """Count `count` lookups of `cache` that were all hits or all misses"""
+    if count <= 0:
+        return
+    CACHE_LOOKUPS.labels(cache=cache, result='hit' if hit else 'miss').inc(count)
+    with _cache_counts_lock:
+        counts = _cache_counts.setdefault(cache, [0, 0])
+        counts[0] += count if hit else 0
+        counts[1] += count
+        CACHE_HIT_RATIO.labels(cache=cache).set(counts[0] / counts[1])
+
+
+def render():
+    """(body, content type) of the current samples in the Prometheus text format"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
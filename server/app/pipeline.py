@@ -0,0 +1,244 @@
+"""
+The /query pipelines: single analysis, batch and Server-Sent Events stream.
+
+Kept out of `main` so that importing the app (and serving /login) does not
+load langgraph, langchain, plotly, pandas or yfinance; the routes import
+this module on first use, and the startup warm-up imports it in the
+background.
+"""
+import os
+import json
+import asyncio
+from typing import List
+
+from fastapi.responses import Response
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from .agents .maingraph import TopGraph
+from .tools .chart_cache import stock_analysis_charts
+from .tools .marketdata import market_data_scope, get_market_data
+from .tools .batch import batch_indicators
+from .tools .stocksummary import stock_summary
+from .responses import QueryResponse
+from .tools .singleflight import AsyncSingleFlight
+from .result_store import ANALYSIS_RESULT_STORE, result_key, load_result, save_result
+
+# Identical concurrent queries (same ticker and question) share one analysis run
+QUERY_COALESCING = os.getenv("QUERY_COALESCING", "true").lower() == "true"
+query_flight = AsyncSingleFlight()
+
+
+async def _run_analysis(query: str, ticker: str):
+    # Tools and charts share one market-data fetch per ticker for the whole request.
+    # The graph and the (blocking yfinance/plotly) chart pipeline run concurrently.
+    with market_data_scope():
+        return await asyncio.gather(
+            TopGraph.ainvoke({
+                "messages": [HumanMessage(content=query)],
+                "stock": ticker
+            }),
+            asyncio.to_thread(stock_analysis_charts, ticker),
+        )
+
+
+def _failed(part) -> bool:
+    """True for a response part that carries an error (e.g. {"error": "No news found"}) instead of a result"""
+    return not isinstance(part, dict) or 'error' in part
+
+
+def _stored_result(query: str, ticker: str, reuse_stored: bool):
+    # result_key reads the symbol index (a table load, or listing downloads on first use),
+    # so it runs on the worker thread together with the lookup
+    key = result_key(query, ticker)
+    return key, load_result(key) if reuse_stored else None
+
+
+async def _answer_query(query: str, ticker: str, reuse_stored: bool = True):
+    # A result stored by any worker earlier in this market session is returned as-is
+    key = None
+    if ANALYSIS_RESULT_STORE:
+        key, payload = await asyncio.to_thread(_stored_result, query, ticker, reuse_stored)
+        if payload:
+            return Response(content=payload, media_type="application/json")
+
+    state, charts_data = await _run_analysis(query, ticker)
+
+    if charts_data is None:
+        return {"error": "Stock data not available for this ticker."}
+        
+    aiInsights = eval(state['messages'][-1].content)
+    sentiment = eval(state['news_sentiment'])
+    
+    # Figures stay as the JSON strings plotly produced; QueryResponse splices them into the body
+    result = QueryResponse({
+        "figures": charts_data.get('figures') or {},
+        "analysis_summary": charts_data['analysis_summary'],  # Use the summary directly
+        "trending_stocks": state.get('trending_stocks', {}),
+        "aiInsights": aiInsights,
+        "sentiment": sentiment
+    })
+    # A failed part is returned but never stored, so the next request in the session retries it
+    if key and not _failed(aiInsights) and not _failed(sentiment):
+        await asyncio.to_thread(save_result, key, result.body)
+    return result
+
+
+async def answer_query(query: str, ticker: str, shared: bool = True):
+    """
+    Response for one /query. With `shared=False` the analysis always runs in
+    this call: no joining an identical query in flight and no stored result
+    (the profiler uses this, so it measures real work).
+    """
+    if not shared:
+        return await _answer_query(query, ticker, reuse_stored=False)
+    if QUERY_COALESCING:
+        key = (ticker.upper(), " ".join(query.lower().split()))
+        return await query_flight.do(key, _answer_query, query, ticker)
+    return await _answer_query(query, ticker)
+
+
+def _load_info(ticker: str):
+    try:
+        get_market_data(ticker).info()
+    except Exception as e:
+        print(f"Could not load info for {ticker}: {e}")
+
+
+def _batch_summaries(tickers: List[str]) -> dict:
+    # One yf.download for every ticker, one indicator pass over the tickers-by-days matrix
+    computed = batch_indicators(tickers)
+    results = {}
+    for ticker in tickers:
+        charts_data = stock_analysis_charts(ticker, include_figures=False)
+        if charts_data is None:
+            results[ticker] = {"error": "Stock data not available for this ticker."}
+            continue
+        results[ticker] = {
+            "analysis_summary": charts_data['analysis_summary'],
+            "stock_summary": stock_summary(ticker, computed.get(ticker)),
+        }
+    return results
+
+
+async def _batch_analysis(query: str, ticker: str) -> dict:
+    state = await TopGraph.ainvoke({
+        "messages": [HumanMessage(content=query)],
+        "stock": ticker
+    })
+    return {
+        "aiInsights": eval(state['messages'][-1].content),
+        "sentiment": eval(state['news_sentiment'])
+    }
+
+
+async def answer_batch(query: str, tickers: List[str], analyze: List[str]):
+    """Per-ticker summaries for `tickers`, plus the LLM analysis for those in `analyze`"""
+    with market_data_scope():
+        # ticker.info has no batch endpoint; fetch them concurrently instead of one after another
+        await asyncio.gather(*(asyncio.to_thread(_load_info, ticker) for ticker in tickers))
+        results = await asyncio.to_thread(_batch_summaries, tickers)
+        analyses = await asyncio.gather(
+            *(_batch_analysis(query, ticker) for ticker in analyze), return_exceptions=True
+        )
+
+    for ticker, analysis in zip(analyze, analyses):
+        if isinstance(analysis, Exception):
+            analysis = {"error": str(analysis)}
+        results[ticker].update(analysis)
+    return QueryResponse({"results": results})
+
+
+def _sse(event: str, data: str) -> str:
+    """Format one Server-Sent Event; `data` must already be single-line JSON"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _tool_output(output):
+    # Prefetched tools hand back the raw dict, ToolNode wraps it in a ToolMessage
+    if isinstance(output, ToolMessage):
+        try:
+            return json.loads(output.content)
+        except json.JSONDecodeError:
+            return output.content
+    return output
+
+
+def _is_node_end(event, node: str) -> bool:
+    # Each node also wraps an inner runnable of the same name; only take the node-level event
+    return (
+        event['event'] == 'on_chain_end'
+        and event['name'] == node
+        and any(tag.startswith('graph:step:') for tag in event.get('tags', []))
+    )
+
+
+async def _stream_charts(ticker: str, queue: asyncio.Queue):
+    charts_data = await asyncio.to_thread(stock_analysis_charts, ticker)
+    if charts_data is None:
+        await queue.put(_sse("error", json.dumps({"error": "Stock data not available for this ticker."})))
+        return
+
+    await queue.put(_sse("analysis_summary", json.dumps(charts_data['analysis_summary'], default=str)))
+    for name, fig_str in charts_data['figures'].items():
+        # Figures are already JSON; splice them in rather than parsing and re-encoding
+        await queue.put(_sse("figure", f'{{"name": {json.dumps(name)}, "figure": {fig_str}}}'))
+
+
+async def _stream_graph(query: str, ticker: str, queue: asyncio.Queue):
+    events = TopGraph.astream_events({
+        "messages": [HumanMessage(content=query)],
+        "stock": ticker
+    }, version="v2")
+
+    async for event in events:
+        kind, name = event['event'], event['name']
+
+        if kind == 'on_tool_end' and name == 'get_news_sentiment':
+            await queue.put(_sse("sentiment", json.dumps(_tool_output(event['data'].get('output')), default=str)))
+
+        elif kind == 'on_chat_model_stream' and event['metadata'].get('langgraph_node') == 'fundamental_analyst':
+            token = event['data']['chunk'].content
+            if token:
+                await queue.put(_sse("token", json.dumps({"content": token})))
+
+        elif _is_node_end(event, 'structure_analyst_output'):
+            sections = (event['data'].get('output') or {}).get('structured_output') or {}
+            for section, content in sections.items():
+                await queue.put(_sse("section", json.dumps({"name": section, "content": content}, default=str)))
+
+        elif _is_node_end(event, 'recommend_trending'):
+            trending = (event['data'].get('output') or {}).get('trending_stocks', {})
+            await queue.put(_sse("trending_stocks", json.dumps(trending, default=str)))
+
+
+async def _run_producer(producer, queue: asyncio.Queue):
+    try:
+        await producer
+    except Exception as e:
+        await queue.put(_sse("error", json.dumps({"error": str(e)})))
+    finally:
+        await queue.put(None)
+
+
+async def stream_query(query: str, ticker: str):
+    queue = asyncio.Queue()
+
+    # Tasks copy the context at creation, so both producers share the market-data scope
+    with market_data_scope():
+        tasks = [
+            asyncio.create_task(_run_producer(_stream_charts(ticker, queue), queue)),
+            asyncio.create_task(_run_producer(_stream_graph(query, ticker, queue), queue)),
+        ]
+
+    try:
+        pending = len(tasks)
+        while pending:
+            item = await queue.get()
+            if item is None:
+                pending -= 1
+                continue
+            yield item
+        yield _sse("done", "{}")
+    finally:
+        for task in tasks:
+            task.cancel()
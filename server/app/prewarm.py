@@ -0,0 +1,104 @@
+"""
+Prewarm scheduler for watched tickers.
+
+One asyncio loop per market in MARKET_CONFIG refreshes the daily and intraday
+bars, fundamentals, news sentiment and chart inputs of every watchlisted
+ticker on that market: once PREWARM_LEAD_MINUTES before the open, then every
+PREWARM_INTERVAL_MINUTES while the session runs. Tickers are started at most
+PREWARM_RATE_PER_MINUTE per minute and PREWARM_CONCURRENCY at a time, so
+the warm-up never floods yfinance or the LLM providers.
+
+It runs inside the app process and is off by default: every worker that
+enables it runs its own copy, so with several workers set PREWARM_ENABLED=true
+on exactly one. Everything it fills except the in-process history cache is
+shared through the database and the OHLCV store.
+"""
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from .database .models import SessionLocal
+from .database .db import get_watched_tickers
+from .tools .markets import MARKET_CONFIG, detect_market, is_market_open, next_market_open, upcoming_trading_day
+
+load_dotenv()
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() == "true"
+PREWARM_LEAD_MINUTES = int(os.getenv("PREWARM_LEAD_MINUTES", 10))
+PREWARM_INTERVAL_MINUTES = int(os.getenv("PREWARM_INTERVAL_MINUTES", 15))
+PREWARM_RATE_PER_MINUTE = int(os.getenv("PREWARM_RATE_PER_MINUTE", 30))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", 2))
+
+
+def watched_tickers(market_type: str):
+    with SessionLocal() as db:
+        tickers = get_watched_tickers(db)
+    return [ticker for ticker in tickers if detect_market(ticker) == market_type]
+
+
+def prewarm_ticker(ticker: str):
+    """Fill every cache a /query for `ticker` reads from"""
+    from .tools .fundamentals import get_fundamentals
+    from .tools .marketdata import get_market_data, market_data_scope
+    from .tools .news import get_news_sentiment
+
+    with market_data_scope():
+        # Only the bars the charts are built from; building the figures here would be thrown away
+        market_data = get_market_data(ticker)
+        market_data.daily()
+        market_data.intraday()
+        # Before the open, fetch for the coming session so the snapshot is still fresh at the bell
+        get_fundamentals(ticker, upcoming_trading_day(detect_market(ticker)))
+        get_news_sentiment.invoke(ticker)
+
+
+def next_run(market_type: str, last_run: float) -> float:
+    """Timestamp of the next prewarm pass for `market_type`"""
+    now = time.time()
+    if is_market_open(market_type):
+        return max(now, last_run + PREWARM_INTERVAL_MINUTES * 60)
+
+    market_open = next_market_open(market_type).timestamp()
+    pre_open = market_open - PREWARM_LEAD_MINUTES * 60
+    if last_run >= pre_open:
+        # Already warmed for this open; the in-session interval takes over from the bell
+        return market_open
+    return max(now, pre_open)
+
+
+async def prewarm(tickers):
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+    spacing = 60 / PREWARM_RATE_PER_MINUTE
+
+    async def run(ticker, delay):
+        await asyncio.sleep(delay)
+        async with semaphore:
+            try:
+                await asyncio.to_thread(prewarm_ticker, ticker)
+            except Exception as e:
+                print(f"Prewarm failed for {ticker}: {e}")
+
+    await asyncio.gather(*(run(ticker, i * spacing) for i, ticker in enumerate(tickers)))
+
+
+async def market_loop(market_type: str):
+    last_run = 0.0
+    while True:
+        await asyncio.sleep(max(0.0, next_run(market_type, last_run) - time.time()))
+        last_run = time.time()
+        try:
+            tickers = await asyncio.to_thread(watched_tickers, market_type)
+            if tickers:
+                print(f"Prewarming {len(tickers)} {MARKET_CONFIG[market_type]['name']} tickers")
+                await prewarm(tickers)
+        except Exception as e:
+            print(f"Prewarm pass for {market_type} failed: {e}")
+
+
+def start_scheduler():
+    """Start one prewarm loop per market; returns the tasks so shutdown can cancel them"""
+    if not PREWARM_ENABLED:
+        return []
+    return [asyncio.create_task(market_loop(market_type)) for market_type in MARKET_CONFIG]
@@ -0,0 +1,147 @@
+"""
+Opt-in sampling profiler for single /query requests.
+
+A request that sends `X-Profile: <PROFILE_TOKEN>` runs with a stack sampler
+that records every PROFILE_INTERVAL_MS which code each thread is executing.
+All threads are sampled, so the chart build and the tools (which run on
+worker threads) show up next to the graph on the event loop. The samples
+are returned as collapsed stacks (`thread;outer;...;inner count`, the input
+format of flamegraph.pl and speedscope), either under a `profile` field of
+the response or, with PROFILE_DIR set, in a file named by the
+`X-Profile-File` response header.
+
+Requests without the header pay for one header lookup and nothing else;
+with PROFILE_TOKEN unset the header is always rejected. Other requests served while a profile runs
+appear in its samples too, so profile on a quiet instance.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from .responses import append_field, dumps
+
+load_dotenv()
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR")  # write profiles here instead of returning them
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_TOP_FRAMES = 20
+
+# (file, function) of leaf frames where a thread waits rather than works; those samples are dropped
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),     # Condition / Event waits
+    ('queue.py', 'get'),          # idle anyio worker threads
+    ('selectors.py', 'select'),   # the event loop with nothing to run
+    ('thread.py', '_worker'),     # idle ThreadPoolExecutor workers (asyncio.to_thread, fundamentals)
+}
+
+
+def profiling_requested(headers) -> bool:
+    """True when the request asks to be profiled; a wrong or unconfigured token is refused"""
+    token = headers.get(PROFILE_HEADER)
+    if token is None:
+        return False
+    if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Profiling is not allowed")
+    return True
+
+
+class StackSampler:
+    """Samples the Python stack of every other thread from a background thread"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                filename, name = stack[-1]
+                if (filename, name.rsplit('.', 1)[-1]) not in IDLE_FRAMES:
+                    self.stacks[(names.get(ident, str(ident)),) + tuple(map(_label, stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """One `frame;frame;... count` line per distinct stack, hottest first"""
+        return [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+
+    def top_frames(self, limit: int = PROFILE_TOP_FRAMES):
+        """Frames that were executing (not calling) in the most samples"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack[-1]] += count
+        return leaves.most_common(limit)
+
+
+def _stack(frame):
+    """(file, qualified name) of each frame, outermost first"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((os.path.basename(code.co_filename), code.co_qualname))
+        frame = frame.f_back
+    return stack[::-1]
+
+
+def _label(entry):
+    filename, name = entry
+    return f"{filename[:-3] if filename.endswith('.py') else filename}:{name}"
+
+
+def _with_profile(result, sampler: StackSampler, ticker: str):
+    profile = {
+        "interval_ms": sampler.interval * 1000,
+        "samples": sampler.samples,
+        "elapsed_seconds": round(sampler.elapsed, 3),
+        "top_frames": sampler.top_frames(),
+    }
+    headers = {}
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = re.sub(r'[^A-Z0-9.&-]', '_', ticker.upper())
+        path = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{name}-{os.getpid()}.collapsed")
+        with open(path, 'w') as f:
+            f.write("\n".join(sampler.collapsed()) + "\n")
+        headers["X-Profile-File"] = path
+    else:
+        profile["collapsed"] = sampler.collapsed()
+
+    # answer_query returns a rendered response, or a plain dict for errors
+    body = result.body if isinstance(result, Response) else dumps(result)
+    return Response(content=append_field(body, "profile", profile), media_type="application/json", headers=headers)
+
+
+async def profile_query(answer_query, query: str, ticker: str):
+    """Run one /query through the pipeline's `answer_query` under the sampler and attach the profile to its response"""
+    with StackSampler() as sampler:
+        # Never served from another request's flight or the result store: profile the real work
+        result = await answer_query(query, ticker, shared=False)
+    return _with_profile(result, sampler, ticker)
@@ -0,0 +1,39 @@
+import orjson
+from fastapi.responses import Response
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content) -> bytes:
+    """Fast JSON encoding that also handles the numpy scalars pandas hands back"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS, default=str)
+
+
+def append_field(body: bytes, name: str, value) -> bytes:
+    """Add a top-level field to an encoded JSON object without decoding it"""
+    body = body.rstrip()
+    separator = b',' if len(body) > 2 else b''
+    return body[:-1] + separator + dumps(name) + b':' + dumps(value) + b'}'
+
+
+def splice_figures(figures: dict) -> bytes:
+    """Join pre-serialized plotly figures into one JSON object without parsing them"""
+    return b'{' + b','.join(dumps(name) + b':' + fig_json.encode() for name, fig_json in figures.items()) + b'}'
+
+
+class QueryResponse(Response):
+    """
+    JSON response for /query.
+
+    `figures` holds the plotly figures as the JSON strings produced by
+    `fig.to_json()`; they are written into the body as-is instead of being
+    parsed back into dicts and encoded a second time.
+    """
+    media_type = "application/json"
+
+    def render(self, content: dict) -> bytes:
+        content = dict(content)
+        figures = content.pop('figures', None) or {}
+        envelope = dumps(content)
+        separator = b',' if len(envelope) > 2 else b''
+        return b'{"figures":' + splice_figures(figures) + separator + envelope[1:]
@@ -0,0 +1,55 @@
+"""
+Finished /query responses shared by every worker through the database.
+
+Results are keyed by ticker, graph route and market-session bucket, so a
+ticker analyzed once in a session is served from the `analysis_result`
+table on any worker or node. While the market is open a result also expires
+after ANALYSIS_RESULT_OPEN_TTL seconds, since prices keep moving; once the
+market is closed it lasts until the next open.
+"""
+import os
+import time
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+from dotenv import load_dotenv
+
+from .agents .maingraph import router_node
+from .database .models import SessionLocal
+from .database .db import get_analysis_result, save_analysis_result
+from .metrics import record_cache
+from .tools .markets import detect_market, is_market_open, market_session_bucket, session_cache_expiry
+
+load_dotenv()
+
+ANALYSIS_RESULT_STORE = os.getenv("ANALYSIS_RESULT_STORE", "true").lower() == "true"
+ANALYSIS_RESULT_OPEN_TTL = int(os.getenv("ANALYSIS_RESULT_OPEN_TTL", 900))  # seconds
+
+
+def result_key(query: str, ticker: str):
+    """(ticker, route, session) for a query; the question only matters through the route it takes"""
+    route = router_node({"messages": [HumanMessage(content=query)]})
+    return ticker.upper(), route, market_session_bucket(detect_market(ticker))
+
+
+def _expires_at(ticker: str) -> datetime:
+    market_type = detect_market(ticker)
+    expires_at = session_cache_expiry(market_type)
+    if is_market_open(market_type):
+        expires_at = min(expires_at, time.time() + ANALYSIS_RESULT_OPEN_TTL)
+    return datetime.fromtimestamp(expires_at)
+
+
+def load_result(key):
+    """Stored response body for `key`, or None when missing or expired"""
+    with SessionLocal() as db:
+        row = get_analysis_result(db, *key)
+        payload = row.payload if row else None
+    record_cache('analysis_result', payload is not None)
+    return payload
+
+
+def save_result(key, payload: bytes):
+    ticker, route, session = key
+    with SessionLocal() as db:
+        save_analysis_result(db, ticker, route, session, payload.decode(), _expires_at(ticker))
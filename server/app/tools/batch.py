@@ -0,0 +1,149 @@
+"""
+Batch analysis for several tickers at once.
+
+Daily bars for every ticker come from one `yf.download([...])` call, are
+saved to the OHLCV store and put into the history cache under the key
+`MarketData.daily()` reads, so the per-ticker tools and charts reuse them. Indicators run once on a
+tickers-by-days matrix instead of once per ticker.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .chart_cache import LRUCache, history_cache, history_cache_expiry
+from .markets import MARKET_CONFIG, detect_market
+from .indicators import compute_indicators
+from .marketdata import DAILY_PERIOD
+from .stocksummary import price_window
+from .ohlcv_store import STORE_PERIOD, save_daily
+from ..metrics import YFINANCE_SECONDS
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Change tables for trending tickers, shared by every query within the TTL
+PRICE_CHANGE_TTL = int(os.getenv("PRICE_CHANGE_TTL", 300))  # seconds
+price_change_cache = LRUCache(max_entries=64, name='price_changes')
+
+
+def _localize(frame, symbol):
+    """yf.download drops the timezone of daily bars; restore the exchange's, like Ticker.history"""
+    tz = MARKET_CONFIG[detect_market(symbol)]['timezone']
+    if frame.index.tz is None:
+        frame.index = frame.index.tz_localize(tz)
+    else:
+        frame.index = frame.index.tz_convert(tz)
+    frame.index.name = 'Date'
+    return frame
+
+
+def download_batch(symbols, period=DAILY_PERIOD, interval='1d'):
+    """
+    OHLCV frames for `symbols` with a single yf.download round trip.
+
+    Symbols already in the history cache are not downloaded again; the
+    fetched frames are cached under the same key `fetch_history` uses.
+    Returns {symbol: frame}; symbols without data are left out.
+    """
+    frames, missing = {}, []
+    for symbol in dict.fromkeys(symbols):
+        cached = history_cache.get((symbol.upper(), period, interval))
+        if cached is not None:
+            frames[symbol] = cached.copy()
+        else:
+            missing.append(symbol)
+
+    if missing:
+        with YFINANCE_SECONDS.labels(call='download').time():
+            data = yf.download(missing, period=period, interval=interval, group_by='ticker',
+                               auto_adjust=True, threads=True, progress=False)
+        for symbol in missing:
+            if data is None or len(data) == 0:
+                break
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            # The shared index is the union of all sessions; drop the ones this ticker did not trade
+            frame = frame[COLUMNS].dropna(how='all')
+            if len(frame) == 0:
+                continue
+            frame = _localize(frame.copy(), symbol)
+            if period == STORE_PERIOD and interval == '1d':
+                # Same bars `MarketData.daily()` loads one ticker at a time: keep the OHLCV store in step
+                frame = save_daily(symbol, frame)
+            history_cache.set((symbol.upper(), period, interval), frame, history_cache_expiry(detect_market(symbol)))
+            frames[symbol] = frame.copy()
+    return frames
+
+
+def indicator_matrix(frames):
+    """
+    Run the indicator engine once over every frame.
+
+    Rows are right-aligned on the latest bar and left-padded with NaN, which
+    the engine treats as "not listed yet". Returns {symbol: computed}, each
+    sliced back to the length of that symbol's frame.
+    """
+    symbols = list(frames)
+    if not symbols:
+        return {}
+    width = max(len(frames[s]) for s in symbols)
+    matrix = {column: np.full((len(symbols), width), np.nan) for column in ('High', 'Low', 'Close', 'Volume')}
+    for row, symbol in enumerate(symbols):
+        frame = frames[symbol]
+        for column, values in matrix.items():
+            values[row, width - len(frame):] = frame[column].to_numpy(dtype=float)
+
+    computed = compute_indicators(matrix['High'], matrix['Low'], matrix['Close'], matrix['Volume'])
+    result = {}
+    for row, symbol in enumerate(symbols):
+        n = len(frames[symbol])
+        result[symbol] = {
+            key: (values[row, width - n:] if values.ndim == 2 else values[row])
+            for key, values in computed.items()
+        }
+    return result
+
+
+def batch_indicators(symbols):
+    """Download every symbol in one call, then compute all indicators in one vectorized pass"""
+    download_batch(symbols)
+    windows = {}
+    for symbol in symbols:
+        frame = price_window(symbol)
+        if len(frame) > 0:
+            windows[symbol] = frame
+    return indicator_matrix(windows)
+
+
+def price_changes(symbols):
+    """
+    Change of the latest session's close (the live price while trading) against its open.
+
+    Only the last few daily bars are downloaded, for every symbol in one call,
+    and the resulting table is cached for PRICE_CHANGE_TTL seconds.
+    Returns {symbol: {"points_change", "percentage_change"}}.
+    """
+    key = tuple(symbol.upper() for symbol in symbols)
+    table = price_change_cache.get(key)
+    if table is not None:
+        return dict(table)
+
+    table = {}
+    for symbol, frame in download_batch(symbols, period="5d").items():
+        last = frame.dropna(subset=['Open', 'Close'])
+        if len(last) == 0:
+            continue
+        opening_price, closing_price = float(last['Open'].iloc[-1]), float(last['Close'].iloc[-1])
+        points_change = closing_price - opening_price
+        percentage_change = (points_change / opening_price) * 100
+        table[symbol] = {"points_change": round(points_change, 2), "percentage_change": round(percentage_change, 2)}
+
+    if table:
+        price_change_cache.set(key, table, time.time() + PRICE_CHANGE_TTL)
+    return dict(table)
@@ -1,90 +1,128 @@
 import yfinance as yf
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
-from sklearn.linear_model import LinearRegression
+from collections import OrderedDict
+from .downsample import downsample_frame
+from .markets import MARKET_CONFIG, detect_market, is_market_open, next_market_open
+from .symbols import symbol_index
+from .singleflight import history_flight
+from . import indicators
+from ..metrics import CHART_SECONDS, YFINANCE_SECONDS, record_cache
+import threading
+import time
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
-# Market configuration
-MARKET_CONFIG = {
-    'US': {
-        'timezone': 'US/Eastern',
-        'currency_symbol': '$',
-        'market_open_time': (9, 30),  # 9:30 AM
-        'market_close_time': (16, 0),  # 4:00 PM
-        'weekends': [5, 6],  # Saturday, Sunday
-        'suffix_patterns': ['', '.US'],  # No suffix or .US
-        'name': 'US Market'
-    },
-    'IN': {
-        'timezone': 'Asia/Kolkata',
-        'currency_symbol': '₹',
-        'market_open_time': (9, 15),  # 9:15 AM
-        'market_close_time': (15, 30),  # 3:30 PM
-        'weekends': [5, 6],  # Saturday, Sunday
-        'suffix_patterns': ['.NS', '.BO'],  # NSE (.NS) and BSE (.BO)
-        'name': 'Indian Market'
-    }
-}
+# History cache configuration
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_MB", 64)) * 1024 * 1024
+HISTORY_CACHE_OPEN_TTL = int(os.getenv("HISTORY_CACHE_OPEN_TTL", 60))  # seconds, while the market is open
 
-def detect_market(symbol):
-    """Detect market type based on symbol suffix"""
-    symbol = symbol.upper()
-    
-    # Check Indian market patterns
-    if any(symbol.endswith(suffix) for suffix in MARKET_CONFIG['IN']['suffix_patterns']):
-        return 'IN'
-    
-    # Check US market patterns or default to US
-    return 'US'
+# Target point counts for server-side downsampling (0 disables it)
+INTRADAY_CHART_POINTS = int(os.getenv("INTRADAY_CHART_POINTS", 150))
+LONG_TERM_CHART_POINTS = int(os.getenv("LONG_TERM_CHART_POINTS", 0))
 
 def calculate_ema(data, span):
     """Calculate Exponential Moving Average"""
-    return data.ewm(span=span, adjust=False).mean()
+    return indicators.ema(data, span)
 
 def calculate_linear_regression(y_values, days):
     """Calculate linear regression line and coefficient"""
-    x_values = np.arange(len(y_values)).reshape(-1, 1)
-    model = LinearRegression()
-    model.fit(x_values, y_values)
-    
-    # Predict values for the line
-    y_pred = model.predict(x_values)
-    
-    # Calculate R-squared
-    r_squared = model.score(x_values, y_values)
-    
-    return y_pred, model.coef_[0], r_squared
+    y_pred, slope, r_squared = indicators.linear_regression(y_values)
+    return y_pred, float(slope), float(r_squared)
 
-def is_market_open(market_type='US'):
-    """Check if the specified market is currently open"""
-    config = MARKET_CONFIG[market_type]
-    now = datetime.now(pytz.timezone(config['timezone']))
-    
-    # Check if it's a weekday
-    if now.weekday() in config['weekends']:
-        return False
-    
-    # Market hours
-    market_open = now.replace(
-        hour=config['market_open_time'][0], 
-        minute=config['market_open_time'][1], 
-        second=0, 
-        microsecond=0
-    )
-    market_close = now.replace(
-        hour=config['market_close_time'][0], 
-        minute=config['market_close_time'][1], 
-        second=0, 
-        microsecond=0
-    )
-    
-    return market_open <= now <= market_close
+def history_cache_expiry(market_type='US'):
+    """Expiry timestamp for cached history: short while open, until the next open once closed"""
+    if is_market_open(market_type):
+        return time.time() + HISTORY_CACHE_OPEN_TTL
+    return next_market_open(market_type).timestamp()
+
+def _frame_nbytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry expiry, capped by total size
+    (`max_bytes`, measured with `sizeof`), by entry count (`max_entries`), or both
+    """
+
+    def __init__(self, max_bytes=None, sizeof=_frame_nbytes, name=None, max_entries=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.max_entries = max_entries
+        self.name = name  # label for the hit/miss metrics; unnamed caches are not counted
+        self._entries = OrderedDict()  # key -> (value, expires_at, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._get(key)
+        if self.name:
+            record_cache(self.name, value is not None)
+        return value
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.time():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        nbytes = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (value, expires_at, nbytes)
+            self._bytes += nbytes
+            while self._over_capacity():
+                self._evict(next(iter(self._entries)))
+
+    def _over_capacity(self):
+        return (
+            (self.max_bytes is not None and self._bytes > self.max_bytes)
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+history_cache = LRUCache(HISTORY_CACHE_MAX_BYTES, name='history')
+
+def _yf_history(symbol, period, interval):
+    with YFINANCE_SECONDS.labels(call='history').time():
+        return yf.Ticker(symbol).history(period=period, interval=interval)
+
+def _load_history(key, symbol, period, interval, loader):
+    frame = loader(symbol, period, interval)
+    if len(frame) > 0:
+        history_cache.set(key, frame, history_cache_expiry(detect_market(symbol)))
+    return frame
+
+def fetch_history(symbol, period, interval='1d', loader=_yf_history):
+    """Fetch price history for (symbol, period, interval) through the in-process history cache"""
+    key = (symbol.upper(), period, interval)
+    frame = history_cache.get(key)
+    if frame is None:
+        # Concurrent misses for the same key wait on one download
+        frame = history_flight.do(key, _load_history, key, symbol, period, interval, loader)
+    # Callers add indicator columns, so never hand out the cached frame itself
+    return frame.copy()
 
 def get_trend_signal(current_price, ema_short, ema_long):
     """Determine trend signal based on EMA crossover"""
@@ -130,108 +168,40 @@ def get_market_time_info(market_type='US'):
         'market_name': config['name']
     }
 
-def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
-    """
-    Generate comprehensive stock analysis charts for AI agent as individual charts
-    
-    Parameters:
-    symbol (str): Stock ticker symbol (e.g., 'AAPL', 'GOOGL', 'RELIANCE.NS', 'TCS.BO')
-    save_html (bool): Whether to save charts as HTML files
-    filename_prefix (str): Custom filename prefix for HTML output
-    
-    Returns:
-    dict: Dictionary containing all chart figures and analysis summary
-    """
-    
-    # Detect market type
-    market_type = detect_market(symbol)
+def _price_hovertemplate(label, name, market_type):
+    """Hover template showing a price in the market's currency format"""
+    return f'<b>{label}</b>: %{{x}}<br><b>{name}</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+
+def build_intraday_chart(intraday_data, title, subtitle, market_type, max_points=None):
+    """Chart 1: Intraday/Current Day Price Movement"""
     config = MARKET_CONFIG[market_type]
-    time_info = get_market_time_info(market_type)
-    
-    print(f"Fetching data for {symbol} ({config['name']})...")
-    print(f"Market Status: {time_info['market_status']} | Time: {time_info['current_time']}")
-    
-    # Create ticker object
-    ticker = yf.Ticker(symbol)
-    
-    # Get stock info
-    try:
-        info = ticker.info
-        company_name = info.get('longName', symbol)
-    except:
-        company_name = symbol
-    
-    # Chart 1: Intraday data (if market open) or previous day
-    if is_market_open(market_type):
-        # Get intraday data for today
-        intraday_data = ticker.history(period="1d", interval="1m")
-        chart1_title = f"{company_name} ({symbol}) - Today's Intraday Price Movement"
-        chart1_subtitle = f"Market Open | Last Updated: {time_info['current_time']}"
-    else:
-        # Get last trading day data
-        intraday_data = ticker.history(period="1d", interval="1m")
-        chart1_title = f"{company_name} ({symbol}) - Last Trading Day Price Movement"
-        if len(intraday_data) > 0:
-            last_trading_day = intraday_data.index[-1].strftime('%Y-%m-%d')
-            chart1_subtitle = f"Market Closed | Last Trading Day: {last_trading_day}"
-        else:
-            chart1_subtitle = f"Market Closed | {time_info['current_time']}"
-    
-    # Charts 2-4: Historical data
-    data_30d = ticker.history(period="30d", interval="1d")
-    data_90d = ticker.history(period="90d", interval="1d")
-    
-    if len(data_30d) == 0 or len(data_90d) == 0:
-        print(f"Error: No data available for {symbol}. Please check the symbol.")
-        return None
-    
-    # Calculate EMAs
-    data_30d['EMA_9'] = calculate_ema(data_30d['Close'], 9)
-    data_30d['EMA_21'] = calculate_ema(data_30d['Close'], 21)
-    
-    data_90d['EMA_20'] = calculate_ema(data_90d['Close'], 20)
-    data_90d['EMA_50'] = calculate_ema(data_90d['Close'], 50)
-    
-    # Calculate trend signal
-    current_price = data_30d['Close'].iloc[-1]
-    ema9_current = data_30d['EMA_9'].iloc[-1]
-    ema21_current = data_30d['EMA_21'].iloc[-1]
-    trend_signal, trend_color = get_trend_signal(current_price, ema9_current, ema21_current)
-    
-    # Calculate linear regression
-    close_prices = data_30d['Close'].values
-    lr_line, lr_coef, r_squared = calculate_linear_regression(close_prices, 30)
-    
-    # Create individual figures
-    figures = {}
-    
-    # Chart 1: Intraday/Current Day Price Movement
-    fig1 = go.Figure()
+    fig = go.Figure()
     
     if len(intraday_data) > 0:
-        fig1.add_trace(
+        plotted = downsample_frame(intraday_data, max_points)
+        fig.add_trace(
             go.Scatter(
-                x=intraday_data.index,
-                y=intraday_data['Close'],
+                x=plotted.index,
+                y=plotted['Close'],
                 mode='lines',
                 name='Price',
                 line=dict(color='blue', width=2),
-                hovertemplate=f'<b>Time</b>: %{{x}}<br><b>Price</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+                hovertemplate=_price_hovertemplate('Time', 'Price', market_type)
             )
         )
         
-        # Add high/low markers for intraday
+        # Add high/low markers for intraday, from the full-resolution bars
         daily_high = intraday_data['High'].max()
         daily_low = intraday_data['Low'].min()
         
-        fig1.add_hline(y=daily_high, line_dash="dash", line_color="green", 
+        fig.add_hline(y=daily_high, line_dash="dash", line_color="green", 
                       annotation_text=f"Day High: {format_currency(daily_high, market_type)}")
-        fig1.add_hline(y=daily_low, line_dash="dash", line_color="red", 
+        fig.add_hline(y=daily_low, line_dash="dash", line_color="red", 
                       annotation_text=f"Day Low: {format_currency(daily_low, market_type)}")
     
-    fig1.update_layout(
+    fig.update_layout(
         title=dict(
-            text=f"<b>{chart1_title}</b><br><span style='font-size:12px;'>{chart1_subtitle}</span>",
+            text=f"<b>{title}</b><br><span style='font-size:12px;'>{subtitle}</span>",
             x=0.5,
             font=dict(size=16)
         ),
@@ -242,46 +212,47 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
         xaxis_title="Time",
         yaxis_title=f"Price ({config['currency_symbol']})"
     )
+    return fig
+
+def build_ema_chart(data_30d, company_name, symbol, trend_signal, trend_color, market_type):
+    """Chart 2: 30-Day Analysis with EMAs"""
+    config = MARKET_CONFIG[market_type]
+    fig = go.Figure()
     
-    figures['intraday'] = fig1
-    
-    # Chart 2: 30-Day Analysis with EMAs
-    fig2 = go.Figure()
-    
-    fig2.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_30d.index,
             y=data_30d['Close'],
             mode='lines',
             name='Close Price',
             line=dict(color='black', width=2),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>Price</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'Price', market_type)
         )
     )
     
-    fig2.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_30d.index,
             y=data_30d['EMA_9'],
             mode='lines',
             name='EMA 9',
             line=dict(color='orange', width=1.5),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>EMA 9</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'EMA 9', market_type)
         )
     )
     
-    fig2.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_30d.index,
             y=data_30d['EMA_21'],
             mode='lines',
             name='EMA 21',
             line=dict(color='purple', width=1.5),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>EMA 21</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'EMA 21', market_type)
         )
     )
     
-    fig2.update_layout(
+    fig.update_layout(
         title=dict(
             text=f"<b>{company_name} ({symbol}) - 30-Day Price Analysis with EMA Signals</b><br>"
                  f"<span style='font-size:12px;'>Current Trend: <span style='color:{trend_color}'>{trend_signal}</span> | {config['name']}</span>",
@@ -295,35 +266,36 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
         xaxis_title="Date",
         yaxis_title=f"Price ({config['currency_symbol']})"
     )
+    return fig
+
+def build_regression_chart(data_30d, lr_line, lr_coef, r_squared, company_name, symbol, market_type):
+    """Chart 3: Linear Regression Analysis"""
+    config = MARKET_CONFIG[market_type]
+    fig = go.Figure()
     
-    figures['ema_analysis'] = fig2
-    
-    # Chart 3: Linear Regression Analysis
-    fig3 = go.Figure()
-    
-    fig3.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_30d.index,
             y=data_30d['Close'],
             mode='lines',
             name='Close Price',
             line=dict(color='blue', width=2),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>Price</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'Price', market_type)
         )
     )
     
-    fig3.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_30d.index,
             y=lr_line,
             mode='lines',
             name=f'Linear Regression (R²={r_squared:.3f})',
             line=dict(color='red', width=2, dash='dash'),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>Trend Line</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'Trend Line', market_type)
         )
     )
     
-    fig3.update_layout(
+    fig.update_layout(
         title=dict(
             text=f"<b>{company_name} ({symbol}) - 30-Day Linear Regression Trend Analysis</b><br>"
                  f"<span style='font-size:12px;'>Regression Slope: {lr_coef:.4f} | R²: {r_squared:.3f} | {config['name']}</span>",
@@ -337,52 +309,50 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
         xaxis_title="Date",
         yaxis_title=f"Price ({config['currency_symbol']})"
     )
+    return fig
+
+def build_long_term_chart(data_90d, long_term_trend, long_term_color, company_name, symbol, market_type, max_points=None):
+    """Chart 4: 90-Day Long-term Analysis"""
+    config = MARKET_CONFIG[market_type]
+    fig = go.Figure()
     
-    figures['regression'] = fig3
-    
-    # Chart 4: 90-Day Long-term Analysis
-    fig4 = go.Figure()
+    # EMAs are already computed on the full series, so they can be thinned with the closes
+    data_90d = downsample_frame(data_90d, max_points)
     
-    fig4.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_90d.index,
             y=data_90d['Close'],
             mode='lines',
             name='Close Price',
             line=dict(color='black', width=2),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>Price</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'Price', market_type)
         )
     )
     
-    fig4.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_90d.index,
             y=data_90d['EMA_20'],
             mode='lines',
             name='EMA 20',
             line=dict(color='green', width=1.5),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>EMA 20</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'EMA 20', market_type)
         )
     )
     
-    fig4.add_trace(
+    fig.add_trace(
         go.Scatter(
             x=data_90d.index,
             y=data_90d['EMA_50'],
             mode='lines',
             name='EMA 50',
             line=dict(color='red', width=1.5),
-            hovertemplate=f'<b>Date</b>: %{{x}}<br><b>EMA 50</b>: {format_currency(0, market_type).replace("0.00", "%{y:.2f}")}<extra></extra>'
+            hovertemplate=_price_hovertemplate('Date', 'EMA 50', market_type)
         )
     )
     
-    # Determine long-term trend
-    ema20_current = data_90d['EMA_20'].iloc[-1]
-    ema50_current = data_90d['EMA_50'].iloc[-1]
-    long_term_trend = "Bullish" if ema20_current > ema50_current else "Bearish"
-    long_term_color = "green" if long_term_trend == "Bullish" else "red"
-    
-    fig4.update_layout(
+    fig.update_layout(
         title=dict(
             text=f"<b>{company_name} ({symbol}) - 90-Day Long-term Analysis with EMAs</b><br>"
                  f"<span style='font-size:12px;'>Long-term Trend: <span style='color:{long_term_color}'>{long_term_trend}</span> | {config['name']}</span>",
@@ -396,8 +366,97 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
         xaxis_title="Date",
         yaxis_title=f"Price ({config['currency_symbol']})"
     )
+    return fig
+
+def stock_analysis_charts(symbol, save_html=False, filename_prefix=None,
+                          intraday_points=INTRADAY_CHART_POINTS, long_term_points=LONG_TERM_CHART_POINTS,
+                          include_figures=True):
+    """
+    Generate comprehensive stock analysis charts for AI agent as individual charts
     
-    figures['long_term'] = fig4
+    Parameters:
+    symbol (str): Stock ticker symbol (e.g., 'AAPL', 'GOOGL', 'RELIANCE.NS', 'TCS.BO')
+    save_html (bool): Whether to save charts as HTML files
+    filename_prefix (str): Custom filename prefix for HTML output
+    intraday_points (int): Target point count for the intraday chart (0 keeps every bar)
+    long_term_points (int): Target point count for the 90-day chart (0 keeps every bar)
+    include_figures (bool): Build the figures; when False only the analysis summary is computed
+    
+    Returns:
+    dict: Dictionary containing all chart figures and analysis summary
+    """
+    from .marketdata import get_market_data
+    
+    # Detect market type
+    market_type = detect_market(symbol)
+    config = MARKET_CONFIG[market_type]
+    time_info = get_market_time_info(market_type)
+    
+    print(f"Fetching data for {symbol} ({config['name']})...")
+    print(f"Market Status: {time_info['market_status']} | Time: {time_info['current_time']}")
+    
+    # Shared with get_stock_summary when called inside the same request scope
+    market_data = get_market_data(symbol)
+    
+    # Company name from the local symbol index; ticker.info only for symbols it does not know
+    company_name = symbol_index.company_name(symbol)
+    if not company_name:
+        try:
+            company_name = market_data.info().get('longName', symbol)
+        except:
+            company_name = symbol
+    
+    # Chart 1: Intraday data (if market open) or previous day
+    intraday_data = market_data.intraday() if include_figures else pd.DataFrame()
+    if is_market_open(market_type):
+        chart1_title = f"{company_name} ({symbol}) - Today's Intraday Price Movement"
+        chart1_subtitle = f"Market Open | Last Updated: {time_info['current_time']}"
+    else:
+        chart1_title = f"{company_name} ({symbol}) - Last Trading Day Price Movement"
+        if len(intraday_data) > 0:
+            last_trading_day = intraday_data.index[-1].strftime('%Y-%m-%d')
+            chart1_subtitle = f"Market Closed | Last Trading Day: {last_trading_day}"
+        else:
+            chart1_subtitle = f"Market Closed | {time_info['current_time']}"
+    
+    # Charts 2-4: Historical data, sliced from the shared daily window
+    data_30d = market_data.daily(days=30)
+    data_90d = market_data.daily(days=90)
+    
+    if len(data_30d) == 0 or len(data_90d) == 0:
+        print(f"Error: No data available for {symbol}. Please check the symbol.")
+        return None
+    
+    # Calculate EMAs
+    data_30d['EMA_9'] = calculate_ema(data_30d['Close'], 9)
+    data_30d['EMA_21'] = calculate_ema(data_30d['Close'], 21)
+    
+    data_90d['EMA_20'] = calculate_ema(data_90d['Close'], 20)
+    data_90d['EMA_50'] = calculate_ema(data_90d['Close'], 50)
+    
+    # Calculate trend signal
+    current_price = data_30d['Close'].iloc[-1]
+    ema9_current = data_30d['EMA_9'].iloc[-1]
+    ema21_current = data_30d['EMA_21'].iloc[-1]
+    trend_signal, trend_color = get_trend_signal(current_price, ema9_current, ema21_current)
+    
+    # Calculate linear regression
+    close_prices = data_30d['Close'].values
+    lr_line, lr_coef, r_squared = calculate_linear_regression(close_prices, 30)
+    
+    # Determine long-term trend
+    ema20_current = data_90d['EMA_20'].iloc[-1]
+    ema50_current = data_90d['EMA_50'].iloc[-1]
+    long_term_trend = "Bullish" if ema20_current > ema50_current else "Bearish"
+    long_term_color = "green" if long_term_trend == "Bullish" else "red"
+    
+    # Create individual figures
+    builders = {} if not include_figures else {
+        'intraday': lambda: build_intraday_chart(intraday_data, chart1_title, chart1_subtitle, market_type, intraday_points),
+        'ema_analysis': lambda: build_ema_chart(data_30d, company_name, symbol, trend_signal, trend_color, market_type),
+        'regression': lambda: build_regression_chart(data_30d, lr_line, lr_coef, r_squared, company_name, symbol, market_type),
+        'long_term': lambda: build_long_term_chart(data_90d, long_term_trend, long_term_color, company_name, symbol, market_type, long_term_points),
+    }
     
     # Calculate key metrics for summary
     price_change_30d = ((data_30d['Close'].iloc[-1] - data_30d['Close'].iloc[0]) / data_30d['Close'].iloc[0]) * 100
@@ -406,7 +465,11 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
     
     
     
-    json_figures = {name: fig.to_json() for name, fig in figures.items()}
+    json_figures = {}
+    for name, build in builders.items():
+        # Building and serializing a figure are timed together; to_json validates the whole figure
+        with CHART_SECONDS.labels(chart=name).time():
+            json_figures[name] = build().to_json()
     # print(json_figures)
 
     return {
@@ -428,4 +491,3 @@ def stock_analysis_charts(symbol, save_html=False, filename_prefix=None):
             'current_time': time_info['current_time']
         }
     }
-
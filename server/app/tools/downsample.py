@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(y, n_out):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket. Bars are treated as evenly spaced.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    # n_out - 2 buckets spanning the points between the first and the last
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_frame(frame: pd.DataFrame, max_points, column='Close') -> pd.DataFrame:
+    """
+    Reduce `frame` to about `max_points` rows with LTTB on `column`.
+
+    The rows holding the column's maximum and minimum are always kept so the
+    visual extremes survive. A falsy `max_points` leaves the frame untouched.
+    """
+    if not max_points or len(frame) <= max_points:
+        return frame
+
+    values = frame[column].to_numpy(dtype=float)
+    keep = np.union1d(lttb_indices(values, max_points), [np.nanargmax(values), np.nanargmin(values)])
+    return frame.iloc[keep]
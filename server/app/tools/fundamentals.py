@@ -0,0 +1,97 @@
+"""
+Fundamentals (`ticker.info`) cached in the database, refreshed once per trading day.
+
+A snapshot taken for the current session (or, by the pre-open prewarm, for
+the upcoming one) is served as-is. A snapshot
+from an earlier session is refreshed in the background; the caller waits up
+to FUNDAMENTALS_REFRESH_TIMEOUT seconds for it and otherwise gets the stale
+snapshot, so a slow upstream never holds up a repeat ticker. Only tickers
+never seen before wait for the network.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import yfinance as yf
+from dotenv import load_dotenv
+
+from .markets import current_trading_day, detect_market
+from ..metrics import YFINANCE_SECONDS, record_cache
+
+load_dotenv()
+
+FUNDAMENTALS_REFRESH_TIMEOUT = float(os.getenv("FUNDAMENTALS_REFRESH_TIMEOUT", 2))  # seconds
+FUNDAMENTALS_REFRESH_WORKERS = int(os.getenv("FUNDAMENTALS_REFRESH_WORKERS", 4))
+
+_executor = ThreadPoolExecutor(max_workers=FUNDAMENTALS_REFRESH_WORKERS, thread_name_prefix="fundamentals")
+_refreshing = {}  # ticker -> Future of the refresh in flight
+_refreshing_lock = threading.Lock()
+
+
+def _read(ticker):
+    from ..database.models import SessionLocal
+    from ..database.db import get_fundamentals
+
+    with SessionLocal() as db:
+        row = get_fundamentals(db, ticker)
+        return (json.loads(row.info), row.trading_day) if row else (None, None)
+
+
+def _fetch(ticker, trading_day):
+    from ..database.models import SessionLocal
+    from ..database.db import save_fundamentals
+
+    with YFINANCE_SECONDS.labels(call='info').time():
+        info = yf.Ticker(ticker).info
+    if info:
+        with SessionLocal() as db:
+            save_fundamentals(db, ticker, json.dumps(info, default=str), trading_day)
+    return info
+
+
+def _refresh(ticker, trading_day):
+    """Start (or join) the refresh of `ticker`; at most one per ticker is in flight"""
+    with _refreshing_lock:
+        future = _refreshing.get(ticker)
+        if future is None:
+            future = _executor.submit(_fetch, ticker, trading_day)
+            _refreshing[ticker] = future
+            future.add_done_callback(lambda _: _forget(ticker, future))
+        return future
+
+
+def _forget(ticker, future):
+    with _refreshing_lock:
+        if _refreshing.get(ticker) is future:
+            del _refreshing[ticker]
+
+
+def get_fundamentals(ticker: str, trading_day=None) -> dict:
+    """
+    `ticker.info` for `ticker`, from the daily cache where possible. A fetched
+    snapshot is tagged with `trading_day` (default: the current session).
+    """
+    key = ticker.upper()
+    current_day = current_trading_day(detect_market(key)).isoformat()
+    trading_day = trading_day.isoformat() if trading_day else current_day
+    info, cached_day = _read(key)
+    # ISO dates compare in date order; a snapshot tagged for an upcoming session is fresh too
+    fresh = info is not None and cached_day >= max(trading_day, current_day)
+    # A stale snapshot counts as a miss even when it ends up being served
+    record_cache('fundamentals', fresh)
+    if fresh:
+        return info
+
+    future = _refresh(key, trading_day)
+    if info is None:
+        return future.result()
+
+    try:
+        return future.result(timeout=FUNDAMENTALS_REFRESH_TIMEOUT) or info
+    except TimeoutError:
+        print(f"Fundamentals refresh for {key} is slow; serving the snapshot from {cached_day}")
+        return info
+    except Exception as e:
+        print(f"Fundamentals refresh for {key} failed ({e}); serving the snapshot from {cached_day}")
+        return info
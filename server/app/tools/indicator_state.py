@@ -0,0 +1,354 @@
+"""
+Incremental indicator state for streaming bars.
+
+Each object keeps just enough running state (EMA/Wilder averages, rolling
+window sums and monotonic deques for rolling highs/lows) to fold in one new
+bar in constant time, independent of how much history came before.
+Values match `indicators.compute_indicators` on the same bars, and every
+state round-trips through `to_dict()` / `from_dict()` as plain JSON so it
+can be cached per ticker.
+"""
+import math
+from collections import deque
+
+
+def _nan_to_none(value):
+    return None if value is None or math.isnan(value) else value
+
+
+def _none_to_nan(value):
+    return math.nan if value is None else value
+
+
+class EMAState:
+    """Running `ewm(alpha, adjust=False)` with a `min_periods` warm-up"""
+
+    def __init__(self, alpha, min_periods=0, value=None, count=0):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = value
+        self.count = count
+
+    @classmethod
+    def span(cls, span, min_periods=0):
+        return cls(2.0 / (span + 1.0), min_periods)
+
+    def update(self, x):
+        self.value = x if self.value is None else self.alpha * x + (1.0 - self.alpha) * self.value
+        self.count += 1
+        return self.current
+
+    @property
+    def current(self):
+        if self.value is None or self.count < self.min_periods:
+            return math.nan
+        return self.value
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'min_periods': self.min_periods, 'value': self.value, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class RollingSumState:
+    """Sum of the last `window` values"""
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.total = sum(self.values)
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.current
+
+    @property
+    def current(self):
+        return self.total if len(self.values) == self.window else math.nan
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['window'], data['values'])
+
+
+class RollingExtremeState:
+    """Max (or min) of the last `window` values, via a monotonic deque (amortized O(1))"""
+
+    def __init__(self, window, mode='max', candidates=(), seen=0):
+        self.window = window
+        self.mode = mode
+        self.candidates = deque(tuple(c) for c in candidates)  # (position, value), best first
+        self.seen = seen
+
+    def _dominates(self, a, b):
+        return a >= b if self.mode == 'max' else a <= b
+
+    def update(self, x):
+        while self.candidates and self._dominates(x, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((self.seen, x))
+        self.seen += 1
+        while self.candidates[0][0] <= self.seen - 1 - self.window:
+            self.candidates.popleft()
+        return self.current
+
+    @property
+    def current(self):
+        return self.candidates[0][1] if self.seen >= self.window else math.nan
+
+    def to_dict(self):
+        return {'window': self.window, 'mode': self.mode, 'candidates': [list(c) for c in self.candidates], 'seen': self.seen}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class RSIState:
+    """Wilder RSI; the first bar contributes a zero move, as in `ta`"""
+
+    def __init__(self, window=14, prev_close=None, up=None, down=None):
+        self.window = window
+        self.prev_close = prev_close
+        self.up = EMAState.from_dict(up) if up else EMAState(1.0 / window, window)
+        self.down = EMAState.from_dict(down) if down else EMAState(1.0 / window, window)
+
+    def update(self, close):
+        change = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        self.up.update(max(change, 0.0))
+        self.down.update(max(-change, 0.0))
+        return self.current
+
+    @property
+    def current(self):
+        up, down = self.up.current, self.down.current
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+    def to_dict(self):
+        return {'window': self.window, 'prev_close': self.prev_close, 'up': self.up.to_dict(), 'down': self.down.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class StochasticState:
+    """Stochastic %K over rolling `window` highs and lows"""
+
+    def __init__(self, window=14, highest=None, lowest=None, close=None):
+        self.window = window
+        self.highest = RollingExtremeState.from_dict(highest) if highest else RollingExtremeState(window, 'max')
+        self.lowest = RollingExtremeState.from_dict(lowest) if lowest else RollingExtremeState(window, 'min')
+        self.close = _none_to_nan(close)
+
+    def update(self, high, low, close):
+        self.highest.update(high)
+        self.lowest.update(low)
+        self.close = close
+        return self.current
+
+    @property
+    def current(self):
+        highest, lowest = self.highest.current, self.lowest.current
+        if highest == lowest:
+            return math.nan
+        return 100.0 * (self.close - lowest) / (highest - lowest)
+
+    def to_dict(self):
+        return {'window': self.window, 'highest': self.highest.to_dict(), 'lowest': self.lowest.to_dict(),
+                'close': _nan_to_none(self.close)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class MACDState:
+    """MACD line (EMA 12 - EMA 26) and its 9-period signal line"""
+
+    def __init__(self, fast=None, slow=None, signal=None):
+        self.fast = EMAState.from_dict(fast) if fast is not None else EMAState.span(12, 12)
+        self.slow = EMAState.from_dict(slow) if slow is not None else EMAState.span(26, 26)
+        self.signal = EMAState.from_dict(signal) if signal is not None else EMAState.span(9, 9)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        # The signal line starts with the first defined MACD value
+        if not math.isnan(line):
+            self.signal.update(line)
+        return self.current
+
+    @property
+    def current(self):
+        return self.fast.current - self.slow.current
+
+    def to_dict(self):
+        return {'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(), 'signal': self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class VWAPState:
+    """Volume weighted average price over the last `window` bars"""
+
+    def __init__(self, window=14, price_volume=None, volume=None):
+        self.window = window
+        self.price_volume = RollingSumState.from_dict(price_volume) if price_volume else RollingSumState(window)
+        self.volume = RollingSumState.from_dict(volume) if volume else RollingSumState(window)
+
+    def update(self, high, low, close, volume):
+        self.price_volume.update((high + low + close) / 3.0 * volume)
+        self.volume.update(volume)
+        return self.current
+
+    @property
+    def current(self):
+        volume = self.volume.current
+        if volume == 0 or math.isnan(volume):
+            return math.nan
+        return self.price_volume.current / volume
+
+    def to_dict(self):
+        return {'window': self.window, 'price_volume': self.price_volume.to_dict(), 'volume': self.volume.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class TrendSlopeState:
+    """
+    Least-squares slope of the last `window` closes against 0..n-1.
+
+    Keeps S = sum(y) and T = sum(i * y_i); sliding the window turns T into
+    T - (S - y_out) + (n - 1) * y_in. Both sums are rebuilt from the window
+    every `window` updates to stop floating point drift.
+    """
+
+    def __init__(self, window=21, values=(), updates=0):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.updates = updates
+        self._rebuild()
+
+    def _rebuild(self):
+        self.total = sum(self.values)
+        self.weighted = sum(i * y for i, y in enumerate(self.values))
+
+    def update(self, close):
+        n = len(self.values)
+        if n == self.window:
+            out = self.values[0]
+            self.weighted = self.weighted - (self.total - out) + (n - 1) * close
+            self.total += close - out
+        else:
+            self.weighted += n * close
+            self.total += close
+        self.values.append(close)
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._rebuild()
+        return self.current
+
+    @property
+    def current(self):
+        n = len(self.values)
+        if n < 2:
+            return math.nan
+        sum_x = n * (n - 1) / 2.0
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6.0
+        return (n * self.weighted - sum_x * self.total) / (n * sum_xx - sum_x ** 2)
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values), 'updates': self.updates}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class IndicatorState:
+    """
+    Every indicator of the stock summary, updated one bar at a time.
+
+    `update()` folds in a closed bar; `preview()` returns the values with an
+    in-progress bar applied without committing it, so a live intraday bar can
+    be re-evaluated on every tick.
+    """
+
+    def __init__(self, rsi=None, stochastic=None, macd=None, vwap=None, ema_9=None, ema_21=None, trend=None, last_bar=None):
+        self.rsi = RSIState.from_dict(rsi) if rsi else RSIState()
+        self.stochastic = StochasticState.from_dict(stochastic) if stochastic else StochasticState()
+        self.macd = MACDState.from_dict(macd) if macd else MACDState()
+        self.vwap = VWAPState.from_dict(vwap) if vwap else VWAPState()
+        self.ema_9 = EMAState.from_dict(ema_9) if ema_9 else EMAState.span(9, 9)
+        self.ema_21 = EMAState.from_dict(ema_21) if ema_21 else EMAState.span(21, 21)
+        self.trend = TrendSlopeState.from_dict(trend) if trend else TrendSlopeState()
+        self.last_bar = last_bar
+
+    @classmethod
+    def from_bars(cls, high, low, close, volume):
+        """Seed the state from historical bars, oldest first"""
+        state = cls()
+        for bar in zip(high, low, close, volume):
+            state.update(*bar)
+        return state
+
+    def update(self, high, low, close, volume):
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        self.rsi.update(close)
+        self.stochastic.update(high, low, close)
+        self.macd.update(close)
+        self.vwap.update(high, low, close, volume)
+        self.ema_9.update(close)
+        self.ema_21.update(close)
+        self.trend.update(close)
+        self.last_bar = [high, low, close, volume]
+        return self.snapshot()
+
+    def preview(self, high, low, close, volume):
+        """Values with an unfinished bar applied, leaving this state untouched (O(window))"""
+        return IndicatorState.from_dict(self.to_dict()).update(high, low, close, volume)
+
+    def snapshot(self):
+        """Latest values, keyed like `indicators.compute_indicators`"""
+        return {
+            'rsi': self.rsi.current,
+            'stochastic': self.stochastic.current,
+            'macd': self.macd.current,
+            'macd_signal': self.macd.signal.current,
+            'vwap': self.vwap.current,
+            'ema_9': self.ema_9.current,
+            'ema_21': self.ema_21.current,
+            'trend_slope': self.trend.current,
+        }
+
+    def to_dict(self):
+        return {
+            'rsi': self.rsi.to_dict(),
+            'stochastic': self.stochastic.to_dict(),
+            'macd': self.macd.to_dict(),
+            'vwap': self.vwap.to_dict(),
+            'ema_9': self.ema_9.to_dict(),
+            'ema_21': self.ema_21.to_dict(),
+            'trend': self.trend.to_dict(),
+            'last_bar': self.last_bar,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
@@ -0,0 +1,172 @@
+"""
+Vectorized technical indicators on contiguous float arrays.
+
+Every function works along the last axis, so it accepts a single series
+(1-D) or a tickers-by-days matrix (2-D). Rows may start with NaN padding
+(e.g. a ticker listed later than the others); each row then starts its
+own recursion at its first valid value. Definitions match the `ta`
+package with `fillna=False`, which the tools used previously.
+"""
+import numpy as np
+
+
+def _as_float(values):
+    return np.ascontiguousarray(values, dtype=float)
+
+
+def _started(x):
+    """True from the first valid (non-NaN) value of each row onwards"""
+    return np.cumsum(~np.isnan(x), axis=-1) > 0
+
+
+def _mask_min_periods(out, x, min_periods):
+    if min_periods > 1:
+        out[np.cumsum(~np.isnan(x), axis=-1) < min_periods] = np.nan
+    return out
+
+
+def ewm(values, alpha, min_periods=0):
+    """
+    Exponentially weighted mean, `pandas.Series.ewm(alpha=alpha, adjust=False)`.
+
+    Solved in closed form per chunk: y_t = b^(j+1) y_prev + a * b^j * cumsum(b^-i z_i).
+    Chunks are sized so b^-j stays far from overflow.
+    """
+    x = _as_float(values)
+    beta = 1.0 - alpha
+    started = _started(x)
+    first = started & ~np.concatenate([np.zeros_like(started[..., :1]), started[..., :-1]], axis=-1)
+
+    # Seed each row with z_s = x_s / a so that y_s = x_s with y_(s-1) = 0
+    z = np.where(started, np.nan_to_num(x), 0.0)
+    z = np.where(first, z / alpha, z)
+
+    n = x.shape[-1]
+    chunk = max(1, int(100 * np.log(10) / -np.log(beta))) if beta > 0 else n
+    out = np.empty_like(z)
+    prev = np.zeros(z.shape[:-1])
+    for start in range(0, n, chunk):
+        seg = z[..., start:start + chunk]
+        decay = beta ** np.arange(seg.shape[-1])
+        acc = np.cumsum(seg / decay, axis=-1) * decay
+        out[..., start:start + chunk] = alpha * acc + prev[..., None] * (decay * beta)
+        prev = out[..., start + seg.shape[-1] - 1]
+
+    out[~started] = np.nan
+    return _mask_min_periods(out, x, min_periods)
+
+
+def ema(values, span, min_periods=0):
+    """Exponential moving average, `ewm(span=span, adjust=False)`"""
+    return ewm(values, 2.0 / (span + 1.0), min_periods)
+
+
+def _shift(x, fill=np.nan):
+    out = np.empty_like(x)
+    out[..., :1] = fill
+    out[..., 1:] = x[..., :-1]
+    return out
+
+
+def _rolling(x, window, reducer):
+    """Rolling reduction over the last axis; NaN until a full window of valid values"""
+    out = np.full_like(x, np.nan)
+    if x.shape[-1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(x, window, axis=-1)
+        out[..., window - 1:] = reducer(windows, axis=-1)
+    return out
+
+
+def rolling_sum(values, window):
+    x = _as_float(values)
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=-1)
+    ccount = np.cumsum(valid, axis=-1)
+    out = csum.copy()
+    out[..., window:] -= csum[..., :-window]
+    count = ccount.copy()
+    count[..., window:] -= ccount[..., :-window]
+    out[count < window] = np.nan
+    return out
+
+
+def rsi(close, window=14):
+    """Relative Strength Index with Wilder smoothing"""
+    x = _as_float(close)
+    diff = x - _shift(x)
+    # Like `ta`, the first bar of each row contributes a zero move
+    diff = np.where(_started(x) & np.isnan(diff), 0.0, diff)
+    up = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    down = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+    ema_up = ewm(up, 1.0 / window, window)
+    ema_down = ewm(down, 1.0 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100.0 - 100.0 / (1.0 + ema_up / ema_down)
+    return np.where(ema_down == 0, 100.0, out)
+
+
+def stochastic(high, low, close, window=14):
+    """Stochastic oscillator %K"""
+    lowest = _rolling(_as_float(low), window, np.min)
+    highest = _rolling(_as_float(high), window, np.max)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 * (_as_float(close) - lowest) / (highest - lowest)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD line and its signal line"""
+    line = ema(close, fast, fast) - ema(close, slow, slow)
+    return line, ema(line, signal, signal)
+
+
+def vwap(high, low, close, volume, window=14):
+    """Rolling volume weighted average price over `window` bars"""
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+    volume = _as_float(volume)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return rolling_sum(typical * volume, window) / rolling_sum(volume, window)
+
+
+def linear_regression(values):
+    """
+    Closed-form least squares fit of `values` against 0..n-1 along the last axis.
+
+    Returns (fitted line, slope, r_squared).
+    """
+    y = _as_float(values)
+    n = y.shape[-1]
+    x = np.arange(n, dtype=float)
+    x_centered = x - x.mean()
+    y_mean = y.mean(axis=-1, keepdims=True)
+
+    slope = (x_centered * (y - y_mean)).sum(axis=-1) / (x_centered ** 2).sum()
+    fitted = y_mean + np.expand_dims(slope, -1) * x_centered
+
+    ss_tot = ((y - y_mean) ** 2).sum(axis=-1)
+    ss_res = ((y - fitted) ** 2).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = np.where(ss_tot == 0, 1.0, 1.0 - ss_res / ss_tot)
+    return fitted, slope, r_squared
+
+
+def compute_indicators(high, low, close, volume, trend_window=21):
+    """
+    All indicators used by the stock summary, from one set of contiguous arrays.
+
+    Returns a dict of arrays aligned with the inputs (`rsi`, `stochastic`,
+    `macd`, `macd_signal`, `vwap`, `ema_9`, `ema_21`) plus `trend_slope`,
+    the least-squares slope of the last `trend_window` closes.
+    """
+    high, low, close, volume = (_as_float(v) for v in (high, low, close, volume))
+    macd_line, macd_signal = macd(close)
+    _, slope, _ = linear_regression(close[..., -trend_window:])
+    return {
+        'rsi': rsi(close),
+        'stochastic': stochastic(high, low, close),
+        'macd': macd_line,
+        'macd_signal': macd_signal,
+        'vwap': vwap(high, low, close, volume),
+        'ema_9': ema(close, 9, 9),
+        'ema_21': ema(close, 21, 21),
+        'trend_slope': slope,
+    }
@@ -0,0 +1,77 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .chart_cache import fetch_history
+from .fundamentals import get_fundamentals
+from .ohlcv_store import load_daily, STORE_PERIOD
+
+# Longest daily window any consumer needs (72 weeks of indicators), fetched once
+DAILY_PERIOD = STORE_PERIOD
+
+
+class MarketData:
+    """
+    Market data for a single symbol, fetched lazily and at most once.
+
+    The daily window, the intraday bars and the fundamentals (`ticker.info`)
+    are each downloaded on first use; every consumer then works on slices of
+    the same frames instead of issuing its own yfinance calls.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in ('daily', 'intraday', 'info')}
+
+    def _load(self, name, loader):
+        # Per-field locks so a concurrent info() does not wait on the history download
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = loader()
+            return self._values[name]
+
+    def daily(self, days: int = None) -> pd.DataFrame:
+        """Daily OHLCV bars, optionally limited to the last `days` calendar days"""
+        frame = self._load('daily', lambda: fetch_history(self.symbol, period=DAILY_PERIOD, interval="1d", loader=load_daily))
+        if days is not None and len(frame) > 0:
+            cutoff = pd.Timestamp.now(tz=frame.index.tz) - pd.Timedelta(days=days)
+            frame = frame[frame.index >= cutoff]
+        return frame.copy()
+
+    def intraday(self) -> pd.DataFrame:
+        """1-minute bars for the current (or last) trading day"""
+        return self._load('intraday', lambda: fetch_history(self.symbol, period="1d", interval="1m")).copy()
+
+    def info(self) -> dict:
+        """Fundamentals and company details from `ticker.info`, through the daily fundamentals cache"""
+        return self._load('info', lambda: get_fundamentals(self.symbol))
+
+
+_request_scope = contextvars.ContextVar("market_data_scope", default=None)
+_scope_lock = threading.Lock()
+
+
+@contextmanager
+def market_data_scope():
+    """Share one MarketData per symbol between everything run inside this block (e.g. one /query)"""
+    token = _request_scope.set({})
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def get_market_data(symbol: str) -> MarketData:
+    """Return the request-scoped MarketData for `symbol`, or a fresh one outside a scope"""
+    scope = _request_scope.get()
+    if scope is None:
+        return MarketData(symbol)
+
+    with _scope_lock:
+        key = symbol.upper()
+        if key not in scope:
+            scope[key] = MarketData(symbol)
+        return scope[key]
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, time as dt_time
+
+import pytz
+
+from .symbols import symbol_index
+
+# Market configuration
+MARKET_CONFIG = {
+    'US': {
+        'timezone': 'US/Eastern',
+        'currency_symbol': '$',
+        'market_open_time': (9, 30),  # 9:30 AM
+        'market_close_time': (16, 0),  # 4:00 PM
+        'weekends': [5, 6],  # Saturday, Sunday
+        'suffix_patterns': ['', '.US'],  # No suffix or .US
+        'name': 'US Market'
+    },
+    'IN': {
+        'timezone': 'Asia/Kolkata',
+        'currency_symbol': '₹',
+        'market_open_time': (9, 15),  # 9:15 AM
+        'market_close_time': (15, 30),  # 3:30 PM
+        'weekends': [5, 6],  # Saturday, Sunday
+        'suffix_patterns': ['.NS', '.BO'],  # NSE (.NS) and BSE (.BO)
+        'name': 'Indian Market'
+    }
+}
+
+def detect_market(symbol):
+    """Detect market type from the symbol index, falling back to the symbol suffix"""
+    symbol = symbol.upper()
+
+    entry = symbol_index.get(symbol)
+    if entry and entry.get('market') in MARKET_CONFIG:
+        return entry['market']
+
+    # Check Indian market patterns
+    if any(symbol.endswith(suffix) for suffix in MARKET_CONFIG['IN']['suffix_patterns']):
+        return 'IN'
+
+    # Check US market patterns or default to US
+    return 'US'
+
+def is_market_open(market_type='US'):
+    """Check if the specified market is currently open"""
+    config = MARKET_CONFIG[market_type]
+    now = datetime.now(pytz.timezone(config['timezone']))
+    
+    # Check if it's a weekday
+    if now.weekday() in config['weekends']:
+        return False
+    
+    # Market hours
+    market_open = now.replace(
+        hour=config['market_open_time'][0], 
+        minute=config['market_open_time'][1], 
+        second=0, 
+        microsecond=0
+    )
+    market_close = now.replace(
+        hour=config['market_close_time'][0], 
+        minute=config['market_close_time'][1], 
+        second=0, 
+        microsecond=0
+    )
+    
+    return market_open <= now <= market_close
+
+def next_market_open(market_type='US'):
+    """Return the next market open for the specified market as an aware datetime"""
+    config = MARKET_CONFIG[market_type]
+    tz = pytz.timezone(config['timezone'])
+    now = datetime.now(tz)
+    open_time = dt_time(*config['market_open_time'])
+    
+    day = now.date()
+    while True:
+        candidate = tz.localize(datetime.combine(day, open_time))
+        if candidate > now and candidate.weekday() not in config['weekends']:
+            return candidate
+        day += timedelta(days=1)
+
+def current_trading_day(market_type='US'):
+    """Date of the session in progress, or of the last one before now"""
+    config = MARKET_CONFIG[market_type]
+    now = datetime.now(pytz.timezone(config['timezone']))
+    day = now.date()
+    if now.time() < dt_time(*config['market_open_time']):
+        day -= timedelta(days=1)
+    while day.weekday() in config['weekends']:
+        day -= timedelta(days=1)
+    return day
+
+def upcoming_trading_day(market_type='US'):
+    """Date of the session in progress, or of the next one while the market is closed"""
+    if is_market_open(market_type):
+        return current_trading_day(market_type)
+    return next_market_open(market_type).date()
+
+def market_session_bucket(market_type='US'):
+    """Label of the current market session, e.g. 'US:2026-10-16:open' or 'US:2026-10-16:closed' after the bell"""
+    state = 'open' if is_market_open(market_type) else 'closed'
+    return f"{market_type}:{current_trading_day(market_type).isoformat()}:{state}"
+
+def session_cache_expiry(market_type='US'):
+    """Expiry timestamp for results cached per market session: today's close while open, else the next open"""
+    if is_market_open(market_type):
+        config = MARKET_CONFIG[market_type]
+        now = datetime.now(pytz.timezone(config['timezone']))
+        close = now.replace(hour=config['market_close_time'][0], minute=config['market_close_time'][1], second=0, microsecond=0)
+        return close.timestamp()
+    return next_market_open(market_type).timestamp()
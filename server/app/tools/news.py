@@ -1,21 +1,17 @@
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
-from typing import Annotated, List, Dict, TypedDict
 from langchain_core.tools import tool
 import yfinance as yf
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import pytz
-from typing import Dict, Any
 import warnings
 warnings.filterwarnings('ignore')
 
-import os 
+import hashlib
 from dotenv import load_dotenv
 load_dotenv()
 
+from ..database.models import SessionLocal, ArticleSentiment
+from ..database.db import get_article_sentiments, save_article_sentiments, get_news_digest, save_news_digest
+from .singleflight import tool_flight
+from ..metrics import YFINANCE_SECONDS, record_cache
+
 
 
 def get_news(stock: str) -> list:
@@ -31,7 +27,8 @@ def get_news(stock: str) -> list:
     try:
         # Fetch the ticker object and retrieve its news
         ticker = yf.Ticker(stock)
-        news = ticker.news
+        with YFINANCE_SECONDS.labels(call='news').time():
+            news = ticker.news
 
         if not news:
             print(f"No news found for {stock}.")
@@ -52,6 +49,9 @@ def get_news(stock: str) -> list:
                     'url': content.get('canonicalUrl', {}).get('url'),
                     'pubdate': content.get('pubDate', '').split('T')[0],
                 }
+                # Without a URL or title an article can be neither cached by key nor shown in the rating
+                if not (current_news['url'] or current_news['title']):
+                    continue
                 all_news.append(current_news)
             except Exception as e:
                 print(f"Error processing news {i}: {e}")
@@ -64,7 +64,9 @@ def get_news(stock: str) -> list:
         return None
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+from functools import lru_cache
+
+from ..llms import get_llm
 
 
 
@@ -80,67 +82,62 @@ class News(BaseModel):
     sentiment_score: int = Field(..., description="Overall sentiment score of the news collected from 1 to 100, higher being positive.")
 
 
-llm = ChatGroq(model="deepseek-r1-distill-llama-70b", groq_api_key = os.getenv("groq_api_key_dev"))
-llm_with_structure = llm.with_structured_output(News)
+class ArticleRating(BaseModel):
+    article_id: int = Field(..., description="The id of the article exactly as given in the input")
+    sentiment: str = Field(..., description="Sentiment of the article for the stock: POSITIVE, NEGATIVE or NEUTRAL")
+    score: int = Field(..., description="Sentiment score of the article from 1 to 100, higher being positive.")
+
+
+class NewsUpdate(BaseModel):
+    ratings: List[ArticleRating] = Field(..., description="One rating for every new article")
+    overall_news_summary: str = Field(..., description="Overall news summary in 4-5 lines, updated with the new articles")
+
 
 PROMPT = """
 You are a senior financial analyst with 15+ years of experience in equity research and sentiment analysis. Your expertise lies in evaluating how news events impact stock prices and investor sentiment.
 
 **TASK OVERVIEW:**
-Analyze the provided news articles for {stock} and assess their collective impact on stock performance and investment attractiveness.
+Rate the NEW news articles provided for {stock} and update the running summary of the news coverage with them.
+Articles that were already rated are listed by title only, for context; do not rate them again.
 
 **DETAILED INSTRUCTIONS:**
 
 **Step 1: Individual Article Analysis**
-For each news article, determine sentiment using these criteria:
+For each new article, determine sentiment using these criteria:
 - **POSITIVE**: Revenue growth, profit increases, strategic partnerships, product launches, market expansion, positive analyst upgrades, regulatory approvals, cost reductions, dividend increases
 - **NEGATIVE**: Revenue decline, losses, layoffs, legal issues, regulatory problems, competitor threats, downgrades, product recalls, management changes (negative context)
 - **NEUTRAL**: Routine announcements, minor operational updates, mixed signals, or unclear impact
 
-**Step 2: News Rating Dictionary**
-Create a dictionary mapping each article title to [sentiment, url]. Ensure:
-- Article titles are exact matches from the provided data
-- Sentiment is exactly "POSITIVE", "NEGATIVE", or "NEUTRAL"
-- URLs are complete and accurate
+**Step 2: Article Ratings**
+Return one rating per new article with:
+- The article id exactly as given in the input
+- Sentiment exactly "POSITIVE", "NEGATIVE", or "NEUTRAL"
+- A sentiment score from 1 to 100 reflecting the article's materiality and direction:
+  - 1-25: Highly negative (major concerns, significant downside risk)
+  - 26-40: Negative (concerning developments, potential headwinds)
+  - 41-60: Neutral (mixed signals, no clear direction)
+  - 61-80: Positive (favorable developments, growth potential)
+  - 81-100: Highly positive (exceptional news, strong upside potential)
 
 **Step 3: Overall Summary (4-5 lines)**
-Synthesize the key themes and their market implications:
+Update the previous summary with the new articles:
 - Highlight the most significant news items affecting stock performance
 - Identify trending patterns (growth trajectory, operational challenges, market positioning)
 - Assess potential short-term and medium-term stock price impact
-- Consider broader market context and sector-specific factors
 - Recommend buying, selling or holding based on the sentiment of the news.
 
-**Step 4: Overall Sentiment Classification**
-Determine the aggregate sentiment based on:
-- Weighted impact of each news item (major announcements > routine updates)
-- Market materiality (earnings reports > press releases)
-- Investor perception and likely market reaction
-- Balance of positive vs negative developments
-
-**Step 5: Sentiment Score (1-100)**
-Assign a numerical score where:
-- 1-25: Highly negative (major concerns, significant downside risk)
-- 26-40: Negative (concerning developments, potential headwinds)
-- 41-60: Neutral (mixed signals, no clear direction)
-- 61-80: Positive (favorable developments, growth potential)
-- 81-100: Highly positive (exceptional news, strong upside potential)
-
-**IMPORTANT CONSIDERATIONS:**
-- Prioritize news items that directly impact financial performance
-- Consider the credibility and timing of news sources
-- Factor in market sentiment and investor psychology
-- Evaluate news within the context of current market conditions
-- Focus on actionable insights for investment decisions
-
-**News Articles for Analysis:**
+**Previous Summary:**
+{previous_summary}
+
+**Already Rated Articles:**
+{rated_titles}
+
+**New Articles for Analysis:**
 {articles}
 
 **CRITICAL REQUIREMENTS:**
-- Analyze ALL provided articles thoroughly
+- Rate ALL new articles, and only the new articles
 - Ensure sentiment classifications are consistent and well-reasoned
-- Provide specific examples from the news to support your overall assessment
-- Consider both explicit information and implied market implications
 - Maintain objectivity while acknowledging potential biases in news reporting
 """
 
@@ -151,24 +148,103 @@ prompt_template = ChatPromptTemplate.from_messages(
     ]
 )
 
-chain_news_sentiment = prompt_template | llm_with_structure
+@lru_cache(maxsize=None)
+def get_news_sentiment_chain():
+    """Prompt and structured-output model, compiled once on first use"""
+    return prompt_template | get_llm('reasoning').with_structured_output(NewsUpdate)
+
+
+def article_key(article: dict) -> str:
+    """Stable cache key for an article: its canonical URL, or its title when there is none"""
+    identity = article.get('url') or article.get('title') or ''
+    return hashlib.sha1(identity.strip().lower().encode('utf-8')).hexdigest()
 
-@tool
-def get_news_sentiment(ticker: str) -> Dict:
-    """Fetches sentiment about the company and its stock based on current financial news."""
-    news = get_news(ticker)
-    if not news:
-        return {"error": "No news found"}
 
+def classify_sentiment(score: float) -> str:
+    """Map a 1-100 sentiment score onto the overall sentiment classes"""
+    if score > 60:
+        return "POSITIVE"
+    if score <= 40:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def rate_new_articles(ticker: str, new_articles: Dict[int, dict], rated_titles: List[str], previous_summary: str) -> NewsUpdate:
+    """Ask the LLM to rate only the articles that are not in the cache"""
+    articles = [dict(article, id=article_id) for article_id, article in new_articles.items()]
     for i in range(3):
       try:
-        result = chain_news_sentiment.invoke(
+        return get_news_sentiment_chain().invoke(
             {
                 "stock": ticker,
-                "articles": news
+                "articles": articles,
+                "rated_titles": rated_titles or "None",
+                "previous_summary": previous_summary or "None",
             }
         )
-        return result.dict()
       except Exception:
         continue
-    raise Exception("Failed to get news sentiment")
\ No newline at end of file
+    raise Exception("Failed to get news sentiment")
+
+
+def news_sentiment(ticker: str) -> Dict:
+    """Body of `get_news_sentiment`"""
+    news = get_news(ticker)
+    if not news:
+        return {"error": "No news found"}
+
+    keys = [article_key(article) for article in news]
+    with SessionLocal() as db:
+        ratings = {key: (row.sentiment, row.score) for key, row in get_article_sentiments(db, ticker, keys).items()}
+        digest = get_news_digest(db, ticker)
+    summary = digest.summary if digest else None
+
+    # Without a stored summary every article has to be seen by the LLM once more
+    new_articles = {
+        i: article for i, (key, article) in enumerate(zip(keys, news))
+        if digest is None or key not in ratings
+    }
+    record_cache('article_sentiment', True, len(news) - len(new_articles))
+    record_cache('article_sentiment', False, len(new_articles))
+
+    if new_articles:
+        rated_titles = [article['title'] for key, article in zip(keys, news) if key in ratings and digest is not None]
+        update = rate_new_articles(ticker, new_articles, rated_titles, summary)
+
+        rows = []
+        for rating in update.ratings:
+            article = new_articles.get(rating.article_id)
+            if article is None:
+                continue
+            key = keys[rating.article_id]
+            ratings[key] = (rating.sentiment, rating.score)
+            rows.append(ArticleSentiment(
+                ticker = ticker, article_key = key, title = article['title'], url = article['url'],
+                sentiment = rating.sentiment, score = rating.score
+            ))
+        summary = update.overall_news_summary
+
+        with SessionLocal() as db:
+            save_article_sentiments(db, rows)
+            save_news_digest(db, ticker, summary)
+
+    rated = [(article, ratings[key]) for key, article in zip(keys, news) if key in ratings]
+    if not rated:
+        raise Exception("Failed to get news sentiment")
+
+    score = round(sum(rating[1] for _, rating in rated) / len(rated))
+    return News(
+        news_rating = {article['title']: [rating[0], article['url']] for article, rating in rated},
+        overall_news_summary = summary,
+        overall_sentiment = classify_sentiment(score),
+        sentiment_score = score,
+    ).dict()
+
+
+@tool
+def get_news_sentiment(ticker: str) -> Dict:
+    """Fetches sentiment about the company and its stock based on current financial news."""
+    # One spelling of the ticker for the flight key and the cached ratings alike
+    ticker = ticker.strip().upper()
+    # Concurrent queries for the same ticker share one news fetch and LLM rating
+    return tool_flight.do(('news_sentiment', ticker), news_sentiment, ticker)
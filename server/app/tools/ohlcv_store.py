@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+import yfinance as yf
+from dotenv import load_dotenv
+
+from .markets import MARKET_CONFIG, detect_market
+from ..metrics import YFINANCE_SECONDS
+
+load_dotenv()
+
+# One append-only file of fixed-size daily bar records per ticker, read back through np.memmap
+STORE_DIR = os.getenv("OHLCV_STORE_DIR", "./ohlcv_store")
+STORE_PERIOD = "2y"  # first full load; covers the 72-week indicator window
+ADJUSTMENT_TOLERANCE = 1e-4  # relative close mismatch that signals a dividend/split re-adjustment
+
+BAR_DTYPE = np.dtype([
+    ('date', '<i8'),  # session date, days since epoch
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(symbol):
+    with _locks_guard:
+        return _locks.setdefault(symbol, threading.Lock())
+
+
+def _path(symbol):
+    return os.path.join(STORE_DIR, re.sub(r'[^A-Z0-9._-]', '_', symbol.upper()) + '.bars')
+
+
+def _period_days(period):
+    """Convert a yfinance period such as '90d', '6mo' or '2y' to calendar days"""
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    return count * {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit]
+
+
+def read_bars(symbol):
+    """Memory-map the stored bars for `symbol`, oldest first, one record per session"""
+    path = _path(symbol)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    # Ignore a torn trailing record from an interrupted append
+    count = os.path.getsize(path) // BAR_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    bars = np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,))
+
+    # Concurrent workers may append the same session twice; keep the last copy of each date
+    dates = bars['date']
+    if np.all(dates[1:] > dates[:-1]):
+        return bars
+    _, last = np.unique(dates[::-1], return_index=True)
+    return np.asarray(bars)[len(bars) - 1 - last]
+
+
+def append_bars(symbol, records):
+    """Append finalized bars to the store"""
+    if len(records) == 0:
+        return
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(_path(symbol), 'ab') as f:
+        # Drop a torn trailing record from an interrupted append, or every record after it is misaligned
+        size = f.seek(0, os.SEEK_END)
+        f.truncate(size - size % BAR_DTYPE.itemsize)
+        f.write(records.tobytes())
+
+
+def rewrite_bars(symbol, records):
+    """Atomically replace all stored bars for `symbol`"""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = _path(symbol)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(records.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _to_records(frame):
+    dates = frame.index.tz_localize(None).normalize().values.astype('datetime64[D]').astype('<i8')
+    records = np.empty(len(frame), dtype=BAR_DTYPE)
+    records['date'] = dates
+    for column in COLUMNS:
+        records[column.lower()] = frame[column].to_numpy(dtype='f8')
+    return records
+
+
+def _to_frame(records, market_type):
+    tz = MARKET_CONFIG[market_type]['timezone']
+    index = pd.DatetimeIndex(pd.to_datetime(np.asarray(records['date']), unit='D'), name='Date').tz_localize(tz)
+    return pd.DataFrame({column: np.asarray(records[column.lower()]) for column in COLUMNS}, index=index)
+
+
+def _finalized(records, market_type):
+    """Drop today's bar while its session is still trading; it is refetched until the close"""
+    config = MARKET_CONFIG[market_type]
+    now = datetime.now(pytz.timezone(config['timezone']))
+    today = np.datetime64(now.date(), 'D').astype('<i8')
+    if (now.hour, now.minute) >= config['market_close_time']:
+        return records[records['date'] <= today]
+    return records[records['date'] < today]
+
+
+def _download(symbol, **kwargs):
+    with YFINANCE_SECONDS.labels(call='history').time():
+        frame = yf.Ticker(symbol).history(interval='1d', **kwargs)
+    return frame[COLUMNS] if len(frame) > 0 else frame
+
+
+def load_daily(symbol, period=STORE_PERIOD, interval='1d'):
+    """
+    Daily OHLCV bars for `symbol` over `period`, served from the local store.
+
+    The first call downloads STORE_PERIOD of history; later calls only fetch
+    bars from the last stored session onwards and append the finalized ones.
+    If the overlapping session no longer matches (Yahoo re-adjusted prices for
+    a dividend or split) the ticker is reloaded in full.
+    """
+    days = _period_days(period)
+    if interval != '1d' or days is None or days > _period_days(STORE_PERIOD):
+        with YFINANCE_SECONDS.labels(call='history').time():
+            return yf.Ticker(symbol).history(period=period, interval=interval)
+
+    market_type = detect_market(symbol)
+    with _lock_for(symbol.upper()):
+        stored = read_bars(symbol)
+        live = np.empty(0, dtype=BAR_DTYPE)
+
+        if len(stored) == 0:
+            frame = _download(symbol, period=STORE_PERIOD)
+            if len(frame) == 0:
+                return frame
+            live = _to_records(frame)
+            stored = _finalized(live, market_type)
+            rewrite_bars(symbol, stored)
+        else:
+            last = stored[-1]
+            start = np.datetime64(int(last['date']), 'D').astype(datetime)
+            frame = _download(symbol, start=start)
+            if len(frame) > 0:
+                fetched = _to_records(frame)
+                overlap = fetched[fetched['date'] == last['date']]
+                if len(overlap) and abs(overlap['close'][0] - last['close']) > ADJUSTMENT_TOLERANCE * abs(last['close']):
+                    frame = _download(symbol, period=STORE_PERIOD)
+                    live = _to_records(frame)
+                    stored = _finalized(live, market_type)
+                    rewrite_bars(symbol, stored)
+                else:
+                    live = fetched[fetched['date'] > last['date']]
+                    new_bars = _finalized(live, market_type)
+                    append_bars(symbol, new_bars)
+                    stored = np.concatenate([np.asarray(stored), new_bars])
+
+    return _serve(stored, live, market_type, days)
+
+
+def save_daily(symbol, frame):
+    """
+    Store a full STORE_PERIOD daily download made elsewhere (e.g. one
+    yf.download for a batch of tickers) and return the bars as `load_daily`
+    would serve them. A fresh full download carries the current price
+    adjustments, so it replaces whatever was stored.
+    """
+    if len(frame) == 0:
+        return frame
+    market_type = detect_market(symbol)
+    live = _to_records(frame[COLUMNS])
+    stored = _finalized(live, market_type)
+    with _lock_for(symbol.upper()):
+        rewrite_bars(symbol, stored)
+    return _serve(stored, live, market_type, _period_days(STORE_PERIOD))
+
+
+def _serve(stored, live, market_type, days):
+    # Unfinalized bars (today's session in progress) are served but never persisted
+    records = np.concatenate([np.asarray(stored), live[live['date'] > (stored['date'][-1] if len(stored) else -1)]])
+    result = _to_frame(records, market_type)
+    cutoff = pd.Timestamp.now(tz=result.index.tz).normalize() - pd.Timedelta(days=days)
+    return result[result.index >= cutoff]
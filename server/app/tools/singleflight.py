@@ -0,0 +1,70 @@
+"""
+Request coalescing: concurrent calls with the same key share one execution.
+
+The first caller for a key runs the work; everyone arriving while it is in
+flight waits for it and gets the same result (or exception). Nothing is kept
+once the call finishes, so this flattens bursts without acting as a cache.
+Callers receive the same object and must not mutate it.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces blocking calls made from different threads"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Coalesces coroutines on one event loop"""
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # A caller that disconnects must not cancel the work the others are waiting on
+        return await asyncio.shield(task)
+
+
+# Shared by the agent tools and the history fetches
+tool_flight = SingleFlight()
+history_flight = SingleFlight()
@@ -1,79 +1,72 @@
-from typing import Union, Dict, Set, List, TypedDict, Annotated
-from langgraph.graph import StateGraph, START, END
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
-import yfinance as yf
-import datetime as dt
+from typing import Union, Dict
 from langchain_core.tools import tool
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.graph.message import add_messages
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.trend import SMAIndicator, EMAIndicator, MACD
-from ta.volume import volume_weighted_average_price
-import traceback
 import pandas as pd
+import numpy as np
+
+from .marketdata import get_market_data
+from .indicators import compute_indicators
+from .symbols import symbol_index
+from .singleflight import tool_flight
+
+
+# 72 weeks of daily bars for the indicators
+INDICATOR_WINDOW_DAYS = 7*24*3
+
+INDICATOR_LABELS = {
+    'rsi': "RSI (Relative Strength Index: measures momentum, >70 is overbought, <30 is oversold)",
+    'stochastic': "Stochastic_Oscillator (Momentum indicator: >80 is overbought, <20 is oversold)",
+    'macd': "MACD (Moving Average Convergence Divergence: measures trend strength and momentum)",
+    'macd_signal': "MACD_Signal (MACD Signal Line: 9-day EMA of MACD, used for crossover signals)",
+    'vwap': "vwap (Volume Weighted Average Price: shows average price based on volume; used for intraday trend)",
+}
+
+
+def format_indicators(dates, computed: Dict, last_n: int = 12) -> Dict:
+    """Last `last_n` values of each indicator keyed by date, as handed to the LLM"""
+    dates = list(dates)[-last_n:]
+    indicators = {}
+    for key, label in INDICATOR_LABELS.items():
+        values = computed[key][-last_n:]
+        indicators[label] = {
+            date: int(value) for date, value in zip(dates, values) if not np.isnan(value)
+        }
+    return indicators
+
 
+def price_window(ticker: str) -> pd.DataFrame:
+    """Daily OHLCV bars the indicators are computed on, with a tz-naive index"""
+    # Sliced from the request's shared daily window instead of a separate yf.download
+    df = get_market_data(ticker).daily(days=INDICATOR_WINDOW_DAYS)
+    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+    df.index = df.index.tz_localize(None)
+    return df
 
 
-def get_stock_prices(ticker: str) -> Union[Dict, str]:
+def get_stock_prices(ticker: str, computed: Dict = None) -> Union[Dict, str]:
     """Fetches historical stock price data and technical indicator for a given stock ticker/symbol for e.g AAPL,MSFT .. etc."""
     try:
-        data = yf.download(
-            ticker,
-            start=dt.datetime.now() - dt.timedelta(weeks=24*3),
-            end=dt.datetime.now(),
-            interval='1d'
-        )
-        df= data.copy()
-        if len(df.columns[0]) > 1:
-            df.columns = [i[0] for i in df.columns]
-        data.reset_index(inplace=True)
+        df = price_window(ticker)
+        data = df.reset_index()
         data.Date = data.Date.astype(str)
 
-        indicators = {}
-
-        rsi_series = RSIIndicator(df['Close'], window=14).rsi().iloc[-12:]
-        indicators["RSI (Relative Strength Index: measures momentum, >70 is overbought, <30 is oversold)"] = {
-            date.strftime('%Y-%m-%d'): int(value) for date, value in rsi_series.dropna().to_dict().items()
-        }
-
-        sto_series = StochasticOscillator(
-            df['High'], df['Low'], df['Close'], window=14).stoch().iloc[-12:]
-        indicators["Stochastic_Oscillator (Momentum indicator: >80 is overbought, <20 is oversold)"] = {
-            date.strftime('%Y-%m-%d'): int(value) for date, value in sto_series.dropna().to_dict().items()
-        }
-
-        macd = MACD(df['Close'])
-        macd_series = macd.macd().iloc[-12:]
-        indicators["MACD (Moving Average Convergence Divergence: measures trend strength and momentum)"] = {
-            date.strftime('%Y-%m-%d'): int(value) for date, value in macd_series.to_dict().items()
-        }
-
-        macd_signal_series = macd.macd_signal().iloc[-12:]
-        indicators["MACD_Signal (MACD Signal Line: 9-day EMA of MACD, used for crossover signals)"] = {
-            date.strftime('%Y-%m-%d'): int(value) for date, value in macd_signal_series.to_dict().items()
-        }
-
-        vwap_series = volume_weighted_average_price(
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            volume=df['Volume'],
-        ).iloc[-12:]
-        indicators["vwap (Volume Weighted Average Price: shows average price based on volume; used for intraday trend)"] = {
-            date.strftime('%Y-%m-%d'): int(value) for date, value in vwap_series.to_dict().items()
-        }
+        # Every indicator from one pass over contiguous arrays, unless a batch already computed them
+        if computed is None:
+            computed = compute_indicators(df['High'], df['Low'], df['Close'], df['Volume'])
+        indicators = format_indicators(df.index.strftime('%Y-%m-%d'), computed)
 
-        return {'stock_price': data.to_dict(orient='records'), 'indicators': indicators}
+        trend_indicators = {key: computed[key] for key in ('ema_9', 'ema_21', 'trend_slope')}
+        return {'stock_price': data.to_dict(orient='records'), 'indicators': indicators, 'trend_indicators': trend_indicators}
     except Exception as e:
         return f"Error fetching price data: {str(e)}"
 
 def get_financial_metrics(ticker: str):
     """Fetches key financial ratios for a given ticker."""
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        company_address = " ".join([info.get(key) for key in ['address1', 'city', 'state','zip','country']])
+        info = get_market_data(ticker).info()
+        company_address = symbol_index.address(ticker)
+        if not company_address:
+            company_address = " ".join([info.get(key) for key in ['address1', 'city', 'state','zip','country'] if info.get(key)])
+            symbol_index.remember(ticker, address=company_address)
 
         return [company_address,
             {
@@ -87,19 +80,12 @@ def get_financial_metrics(ticker: str):
 
 
 
-@tool
-def get_stock_summary(ticker: str) -> Dict:
-    """Returns a compact summary of stock address, indicators, financials, summary statisitics and trend detection."""
+def stock_summary(ticker: str, computed: Dict = None) -> Dict:
+    """Body of `get_stock_summary`; `computed` takes indicators from a batch run"""
     try:
-        import pandas as pd
-        import numpy as np
-        import plotly.graph_objects as go
-        import plotly.express as px
-        from ta.trend import EMAIndicator
-        from sklearn.linear_model import LinearRegression
-
-        price_data = get_stock_prices(ticker)
+        price_data = get_stock_prices(ticker, computed)
         indicators = price_data["indicators"]
+        trend_indicators = price_data["trend_indicators"]
         # print("indicators are...")
         # print(indicators)
         full_prices = pd.DataFrame(price_data["stock_price"])
@@ -110,21 +96,18 @@ def get_stock_summary(ticker: str) -> Dict:
         full_prices.sort_values("Date", inplace=True)
         full_prices.reset_index(drop=True, inplace=True)
 
-        ema_9 = EMAIndicator(full_prices["Close"], window=9).ema_indicator()
-        ema_21 = EMAIndicator(full_prices["Close"], window=21).ema_indicator()
+        ema_9 = trend_indicators["ema_9"]
+        ema_21 = trend_indicators["ema_21"]
 
-        if ema_9.iloc[-2] < ema_21.iloc[-2] and ema_9.iloc[-1] > ema_21.iloc[-1]:
+        if ema_9[-2] < ema_21[-2] and ema_9[-1] > ema_21[-1]:
             crossover = "bullish_crossover"
-        elif ema_9.iloc[-2] > ema_21.iloc[-2] and ema_9.iloc[-1] < ema_21.iloc[-1]:
+        elif ema_9[-2] > ema_21[-2] and ema_9[-1] < ema_21[-1]:
             crossover = "bearish_crossover"
         else:
             crossover = "no_crossover"
 
-        last_n = 21
-        recent_close = full_prices["Close"].tail(last_n).values.reshape(-1, 1)
-        X = np.arange(len(recent_close)).reshape(-1, 1)
-        model = LinearRegression().fit(X, recent_close)
-        slope = model.coef_[0][0]
+        # Least-squares slope of the last 21 closes
+        slope = trend_indicators["trend_slope"]
 
         if slope > 0.3:
             trend = "bullish"
@@ -168,8 +151,8 @@ def get_stock_summary(ticker: str) -> Dict:
             "financial_metrics": key_metrics,
             "trend_detection": {
                 "linear_slope": round(float(slope), 4),
-                "ema_9": round(ema_9.iloc[-1], 2),
-                "ema_21": round(ema_21.iloc[-1], 2),
+                "ema_9": round(float(ema_9[-1]), 2),
+                "ema_21": round(float(ema_21[-1]), 2),
                 "crossover": crossover,
                 "trend": trend
             }
@@ -179,3 +162,8 @@ def get_stock_summary(ticker: str) -> Dict:
         return {"error": str(e)}
 
 
+@tool
+def get_stock_summary(ticker: str) -> Dict:
+    """Returns a compact summary of stock address, indicators, financials, summary statisitics and trend detection."""
+    # Concurrent queries for the same ticker share one computation
+    return tool_flight.do(('stock_summary', ticker.upper()), stock_summary, ticker)
@@ -0,0 +1,244 @@
+"""
+Local index of listed symbols: name, exchange, market and address.
+
+Built from the exchanges' published listing files (Nasdaq Trader's symbol
+directory for US listings, the NSE equity list for India), stored in the
+`symbol_index` table and held in memory once loaded. It is loaded lazily on
+first use; each market is built in the background when it has never been
+built or its last build is older than SYMBOL_INDEX_MAX_AGE_DAYS, so lookups
+never wait on the network. Markets are built and recorded separately, so a
+failing source only leaves its own market unbuilt; until a market is built,
+its symbols are not validated (`covers` is False) and callers fall back to
+the suffix rule. Addresses are not in the listing files; they are added from
+`ticker.info` the first time a symbol's fundamentals are fetched.
+"""
+import csv
+import io
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SYMBOL_INDEX_MAX_AGE_DAYS = int(os.getenv("SYMBOL_INDEX_MAX_AGE_DAYS", 7))
+REBUILD_RETRY_INTERVAL = timedelta(minutes=15)  # after a failed or recent rebuild
+
+NASDAQ_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+NSE_EQUITY_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+OTHER_EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+
+# NSE rejects requests without a browser-like user agent
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def _get(url):
+    response = httpx.get(url, headers=HEADERS, timeout=30, follow_redirects=True)
+    response.raise_for_status()
+    return response.text
+
+
+def _pipe_rows(text):
+    # The last line is a "File Creation Time" trailer
+    lines = [line for line in text.splitlines() if line and not line.startswith('File Creation Time')]
+    return csv.DictReader(lines, delimiter='|')
+
+
+# "Apple Inc. - Common Stock", "Agilent Technologies, Inc. Common Stock" -> the company name
+SECURITY_SUFFIX = re.compile(
+    r'\s+-\s+.*$|\s+(Common Stock|Ordinary Shares|American Depositary Shares|Class [A-Z] (Common|Ordinary)).*$',
+    re.IGNORECASE,
+)
+
+
+def company_name(security_name):
+    return SECURITY_SUFFIX.sub('', security_name or '').strip() or security_name
+
+
+def _yahoo_symbol(symbol):
+    # Share classes use a dot on the exchanges and a dash on Yahoo Finance (BRK.B -> BRK-B)
+    return symbol.strip().upper().replace('.', '-')
+
+
+def fetch_us_listings():
+    entries = []
+    for row in _pipe_rows(_get(NASDAQ_LISTED_URL)):
+        if row.get('Test Issue') == 'N':
+            entries.append({'symbol': _yahoo_symbol(row['Symbol']), 'name': company_name(row['Security Name']), 'exchange': 'NASDAQ', 'market': 'US'})
+    for row in _pipe_rows(_get(OTHER_LISTED_URL)):
+        if row.get('Test Issue') == 'N':
+            entries.append({'symbol': _yahoo_symbol(row['ACT Symbol']), 'name': company_name(row['Security Name']),
+                            'exchange': OTHER_EXCHANGES.get(row['Exchange'], row['Exchange']), 'market': 'US'})
+    return entries
+
+
+def fetch_in_listings():
+    reader = csv.DictReader(io.StringIO(_get(NSE_EQUITY_URL)))
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+    return [
+        {'symbol': f"{row['SYMBOL'].strip().upper()}.NS", 'name': row['NAME OF COMPANY'].strip(), 'exchange': 'NSE', 'market': 'IN'}
+        for row in reader
+    ]
+
+
+# Listing source per market; each market is built and recorded on its own
+LISTING_SOURCES = {'US': fetch_us_listings, 'IN': fetch_in_listings}
+
+
+def download_listings(market):
+    """Every symbol listed in `market`, from its exchange's listing files"""
+    return LISTING_SOURCES[market]()
+
+
+def listing_market(symbol):
+    """Market whose listings would contain `symbol`, by its suffix (.NS/.BO are Indian, anything else US)"""
+    return 'IN' if symbol.upper().endswith(('.NS', '.BO')) else 'US'
+
+
+def _read_table():
+    """(entries, {market: time of its last build})"""
+    from ..database.models import SessionLocal
+    from ..database.db import get_listed_symbols, get_symbol_index_builds
+
+    with SessionLocal() as db:
+        entries = {
+            row.symbol: {'symbol': row.symbol, 'name': row.name, 'exchange': row.exchange, 'market': row.market, 'address': row.address}
+            for row in get_listed_symbols(db)
+        }
+        built_at = {build.market: build.built_at for build in get_symbol_index_builds(db)}
+    return entries, built_at
+
+
+def _write_table(market, entries, built_at):
+    from ..database.models import SessionLocal, ListedSymbol
+    from ..database.db import replace_listed_symbols
+
+    with SessionLocal() as db:
+        replace_listed_symbols(db, market, [ListedSymbol(updated_at=built_at, **entry) for entry in entries], built_at)
+
+
+def _update_row(symbol, fields):
+    from ..database.models import SessionLocal
+    from ..database.db import update_listed_symbol
+
+    with SessionLocal() as db:
+        update_listed_symbol(db, symbol, **fields)
+
+
+class SymbolIndex:
+    """In-memory view of the `symbol_index` table, keyed by Yahoo Finance symbol"""
+
+    def __init__(self, loader=download_listings, read=_read_table, write=_write_table, update=_update_row):
+        self.loader = loader
+        self.read = read
+        self.write = write
+        self.update = update
+        self._entries = None
+        self._built_at = {}  # market -> last successful build
+        self._attempted_at = {}  # market -> last build attempt
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._entries is None:
+                self._entries, self._built_at = self.read()
+        if any(self._stale(market) for market in LISTING_SOURCES):
+            self._refresh_in_background()
+        return self._entries
+
+    def _stale(self, market):
+        now = datetime.now()
+        attempted_at = self._attempted_at.get(market)
+        if attempted_at and now - attempted_at < REBUILD_RETRY_INTERVAL:
+            return False
+        built_at = self._built_at.get(market)
+        return built_at is None or now - built_at > timedelta(days=SYMBOL_INDEX_MAX_AGE_DAYS)
+
+    def _rebuild(self, market):
+        self._attempted_at[market] = datetime.now()
+        try:
+            entries = {entry['symbol']: entry for entry in self.loader(market)}
+        except Exception as e:
+            print(f"Could not build the {market} symbol index: {e}")
+            return
+        if not entries:
+            return
+        # Keep the addresses learned from ticker.info across rebuilds
+        for symbol, entry in entries.items():
+            entry['address'] = (self._entries.get(symbol) or {}).get('address')
+        built_at = datetime.now()
+        self.write(market, list(entries.values()), built_at)
+        with self._lock:
+            # Swap in a new dict so lookups never see a half-replaced market
+            self._entries = {**{symbol: entry for symbol, entry in self._entries.items() if entry.get('market') != market}, **entries}
+            self._built_at = {**self._built_at, market: built_at}
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            # Lookups keep serving the current entries (or the suffix rule) while the listings download
+            try:
+                for market in LISTING_SOURCES:
+                    if self._stale(market):
+                        self._rebuild(market)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def covers(self, symbol: str) -> bool:
+        """True once the listings of `symbol`'s market have been built; callers skip validation otherwise"""
+        self._ensure_loaded()
+        return listing_market(symbol) in self._built_at
+
+    @property
+    def available(self) -> bool:
+        """False until every market has been built (e.g. offline or still downloading)"""
+        self._ensure_loaded()
+        return all(market in self._built_at for market in LISTING_SOURCES)
+
+    def get(self, symbol: str):
+        """Index entry for `symbol`; a BSE (.BO) symbol resolves through its NSE listing"""
+        entries = self._ensure_loaded()
+        symbol = symbol.upper()
+        if symbol.endswith('.BO'):
+            symbol = symbol[:-3] + '.NS'
+        return entries.get(symbol)
+
+    def is_listed(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+
+    def company_name(self, symbol: str):
+        entry = self.get(symbol)
+        return entry['name'] if entry else None
+
+    def address(self, symbol: str):
+        entry = self.get(symbol)
+        return entry.get('address') if entry else None
+
+    def remember(self, symbol: str, **fields):
+        """Store details learned elsewhere (e.g. the address from ticker.info) for `symbol`"""
+        symbol = symbol.upper()
+        if not self.covers(symbol):
+            # A lone row would pass for a built market and reject every other symbol in it
+            return
+        with self._lock:
+            entry = self._entries.setdefault(symbol, {'symbol': symbol, 'name': None, 'exchange': None, 'market': None, 'address': None})
+            entry.update(fields)
+        try:
+            self.update(symbol, fields)
+        except Exception as e:
+            print(f"Could not save symbol details for {symbol}: {e}")
+
+
+symbol_index = SymbolIndex()
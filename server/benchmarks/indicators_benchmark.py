@@ -0,0 +1,74 @@
+"""
+Benchmark the NumPy indicator engine against the previous `ta` + scikit-learn path.
+
+Run from the server directory (needs `ta` and `scikit-learn` installed for the baseline):
+
+    python -m benchmarks.indicators_benchmark
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.tools.indicators import compute_indicators
+
+BARS = 504  # 72 weeks of daily bars, as fetched by get_stock_prices
+REPEAT = 200
+
+
+def sample_frame(bars=BARS, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=bars))
+    return pd.DataFrame({
+        'High': close + rng.random(bars),
+        'Low': close - rng.random(bars),
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 10_000_000, bars).astype(float),
+    }, index=pd.date_range('2024-01-01', periods=bars, freq='B'))
+
+
+def baseline(df):
+    """The indicator work get_stock_prices and get_stock_summary used to do"""
+    from ta.momentum import RSIIndicator, StochasticOscillator
+    from ta.trend import EMAIndicator, MACD
+    from ta.volume import volume_weighted_average_price
+    from sklearn.linear_model import LinearRegression
+
+    macd = MACD(df['Close'])
+    recent_close = df['Close'].tail(21).values.reshape(-1, 1)
+    model = LinearRegression().fit(np.arange(len(recent_close)).reshape(-1, 1), recent_close)
+    return {
+        'rsi': RSIIndicator(df['Close'], window=14).rsi(),
+        'stochastic': StochasticOscillator(df['High'], df['Low'], df['Close'], window=14).stoch(),
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'vwap': volume_weighted_average_price(df['High'], df['Low'], df['Close'], df['Volume']),
+        'ema_9': EMAIndicator(df['Close'], window=9).ema_indicator(),
+        'ema_21': EMAIndicator(df['Close'], window=21).ema_indicator(),
+        'trend_slope': model.coef_[0][0],
+    }
+
+
+def engine(df):
+    return compute_indicators(df['High'], df['Low'], df['Close'], df['Volume'])
+
+
+def main():
+    df = sample_frame()
+
+    expected, actual = baseline(df), engine(df)
+    for key, values in expected.items():
+        np.testing.assert_allclose(np.asarray(actual[key], dtype=float), np.asarray(values, dtype=float),
+                                   rtol=1e-9, atol=1e-9, err_msg=key)
+
+    baseline_time = min(timeit.repeat(lambda: baseline(df), number=REPEAT, repeat=3)) / REPEAT
+    engine_time = min(timeit.repeat(lambda: engine(df), number=REPEAT, repeat=3)) / REPEAT
+    print(f"ta + sklearn : {baseline_time * 1e3:8.3f} ms per ticker")
+    print(f"numpy engine : {engine_time * 1e3:8.3f} ms per ticker")
+    print(f"speedup      : {baseline_time / engine_time:8.1f}x")
+
+    assert engine_time < baseline_time, "indicator engine is slower than the ta/sklearn baseline"
+
+
+if __name__ == '__main__':
+    main()
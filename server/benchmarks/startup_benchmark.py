@@ -0,0 +1,53 @@
+"""
+Guard the cold-start cost of importing the app.
+
+Each sample imports `app.main` in a fresh interpreter, as a new worker or
+replica would. The import must stay within the budget, and it must not pull in
+the heavy modules the query pipeline defers until first use (or the startup
+warm-up). Run from the server directory:
+
+    python -m benchmarks.startup_benchmark
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAMPLES = 5
+BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 1.5))
+
+# Loaded by app.pipeline, never by app.main itself
+DEFERRED_MODULES = ['plotly', 'yfinance', 'pandas', 'langgraph', 'langchain_core', 'langchain_community', 'openai', 'groq']
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def sample(code=PROBE):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    sample()  # the first run pays for filling the OS file cache
+    samples = [sample() for _ in range(SAMPLES)]
+    seconds = [s["seconds"] for s in samples]
+    pipeline = sample(PROBE.replace("import app.main", "import app.main, app.pipeline"))
+
+    print(f"import app.main          : {statistics.median(seconds) * 1e3:8.1f} ms (median of {SAMPLES})")
+    print(f"+ app.pipeline (deferred) : {pipeline['seconds'] * 1e3:8.1f} ms")
+
+    loaded = samples[0]["loaded"]
+    assert not loaded, f"app.main imports modules that should be deferred: {loaded}"
+    assert statistics.median(seconds) < BUDGET_SECONDS, f"app.main import exceeds the {BUDGET_SECONDS}s startup budget"
+
+
+if __name__ == '__main__':
+    main()